@@ -6,7 +6,15 @@ This package contains core functionality and utilities for the Agent2000 applica
 # This file makes the 'python' directory a Python package
 # All submodules will be imported here if needed
 
-# Import commonly used modules for easier access
-from .helpers import *
+import importlib
 
 __version__ = '0.1.0'
+
+
+def __getattr__(name):
+    # Re-export commonly used helpers lazily instead of `from .helpers import *`,
+    # which would force every helper submodule to load on `import python`
+    helpers = importlib.import_module('.helpers', __name__)
+    if name in helpers._EXPORTS:
+        return getattr(helpers, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,105 +1,131 @@
 """
 Python helpers package for the Agent2000 application.
 This package contains various utility modules used throughout the application.
-"""
 
-# First, define IS_WINDOWS here to break the circular import
+Submodules are imported lazily (PEP 562): ``import python.helpers`` loads
+nothing beyond this file, and each exported name pulls in its submodule on
+first access.
+"""
+import importlib
 import os
-import sys
 
 # Define platform detection here to avoid circular imports
 IS_WINDOWS = os.name == 'nt'
 
-# Now import runtime (which will use our IS_WINDOWS constant)
-from . import runtime
-
-# Then import everything else
-from .dotenv import load_dotenv
-from .rate_limiter import RateLimiter
-from .extract_tools import *
-from .files import *
-from .errors import *
-from .history import *
-from .tokens import *
-
-# Get the runtime exports
-runtime_exports = getattr(runtime, '__all__', [])
-
-# Define our exports
-exports = [
-    # Platform detection
-    'IS_WINDOWS',
-    
+# Map every exported name to the submodule that defines it
+_LAZY = {
     # From dotenv
-    'load_dotenv',
-    
+    'load_dotenv': '.dotenv',
+
     # From rate_limiter
-    'RateLimiter',
-    
+    'RateLimiter': '.rate_limiter',
+    'SlidingWindowRateLimiter': '.rate_limiter',
+
     # From extract_tools
-    'extract_json_from_text',
-    'extract_urls',
-    'extract_emails',
-    'extract_phone_numbers',
-    'extract_hashtags',
-    'extract_mentions',
-    'extract_file_extension',
-    'extract_metadata',
-    
+    'extract_json_from_text': '.extract_tools',
+    'extract_urls': '.extract_tools',
+    'extract_emails': '.extract_tools',
+    'extract_phone_numbers': '.extract_tools',
+    'extract_hashtags': '.extract_tools',
+    'extract_mentions': '.extract_tools',
+    'extract_file_extension': '.extract_tools',
+    'extract_metadata': '.extract_tools',
+
     # From files
-    'ensure_dir',
-    'file_exists',
-    'dir_exists',
-    'get_file_size',
-    'get_file_hash',
-    'get_mime_type',
-    'read_file_chunks',
-    'write_file',
-    'copy_file',
-    'delete_file',
-    'list_files',
-    'get_file_info',
-    
+    'ensure_dir': '.files',
+    'file_exists': '.files',
+    'dir_exists': '.files',
+    'get_file_size': '.files',
+    'get_file_hash': '.files',
+    'get_mime_type': '.files',
+    'read_file_chunks': '.files',
+    'write_file': '.files',
+    'copy_file': '.files',
+    'delete_file': '.files',
+    'list_files': '.files',
+    'get_file_info': '.files',
+
     # From errors
-    'BaseError',
-    'ConfigurationError',
-    'ValidationError',
-    'AuthenticationError',
-    'AuthorizationError',
-    'NotFoundError',
-    'RateLimitError',
-    'TimeoutError',
-    'NetworkError',
-    'ServiceUnavailableError',
-    'handle_error',
-    
+    'BaseError': '.errors',
+    'ConfigurationError': '.errors',
+    'ValidationError': '.errors',
+    'AuthenticationError': '.errors',
+    'AuthorizationError': '.errors',
+    'NotFoundError': '.errors',
+    'RateLimitError': '.errors',
+    'TimeoutError': '.errors',
+    'NetworkError': '.errors',
+    'ServiceUnavailableError': '.errors',
+    'handle_error': '.errors',
+
     # From history
-    'HistoryEntry',
-    'HistoryConfig',
-    'HistoryManager',
-    'get_default_history_manager',
-    
+    'HistoryEntry': '.history',
+    'HistoryConfig': '.history',
+    'HistoryManager': '.history',
+    'get_default_history_manager': '.history',
+
     # From tokens
-    'TokenUsageStats',
-    'count_tokens',
-    'estimate_tokens',
-    'truncate_to_token_limit',
-    'TokenWindow',
-    'TokenBucket',
-    'tokenize_json',
-    'detokenize_json',
-    'get_model_context_size',
-]
-
-# Add runtime exports
-for name in runtime_exports:
-    if name not in exports:  # Avoid duplicates
-        exports.append(name)
-
-# Set __all__
-__all__ = exports
-
-# Clean up
-import sys
-del sys.modules[__name__].runtime_exports
-del sys.modules[__name__].exports
+    'TokenUsageStats': '.tokens',
+    'count_tokens': '.tokens',
+    'estimate_tokens': '.tokens',
+    'estimate_tokens_batch': '.tokens',
+    'truncate_to_token_limit': '.tokens',
+    'count_tokens_async': '.tokens',
+    'truncate_to_token_limit_async': '.tokens',
+    'TokenWindow': '.tokens',
+    'TokenBucket': '.tokens',
+    'tokenize_json': '.tokens',
+    'tokenize_json_batch': '.tokens',
+    'tokenize_json_compact': '.tokens',
+    'detokenize_json': '.tokens',
+    'get_model_context_size': '.tokens',
+
+    # From runtime
+    'IS_LINUX': '.runtime',
+    'IS_MAC': '.runtime',
+    'IS_POSIX': '.runtime',
+    'PYTHON_VERSION': '.runtime',
+    'PYTHON_VERSION_STR': '.runtime',
+    'PLATFORM': '.runtime',
+    'PLATFORM_RELEASE': '.runtime',
+    'PLATFORM_VERSION': '.runtime',
+    'CPU_COUNT': '.runtime',
+    'MEMORY_TOTAL': '.runtime',
+    'MEMORY_AVAILABLE': '.runtime',
+    'get_memory_total': '.runtime',
+    'get_memory_available': '.runtime',
+    'get_platform_info': '.runtime',
+    'is_program_installed': '.runtime',
+    'run_command': '.runtime',
+    'get_environment_vars': '.runtime',
+    'format_bytes': '.runtime',
+}
+
+# Submodules that used to be bound eagerly as package attributes
+_SUBMODULES = {
+    'dotenv', 'rate_limiter', 'runtime', 'extract_tools',
+    'files', 'errors', 'history', 'tokens',
+}
+
+__all__ = ('IS_WINDOWS', *_LAZY)
+
+# O(1) membership tests against __all__ (used by the parent package)
+_EXPORTS = frozenset(__all__)
+
+
+def __getattr__(name):
+    mod_path = _LAZY.get(name)
+    if mod_path is None:
+        if name in _SUBMODULES:
+            return importlib.import_module(f'.{name}', __name__)
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    mod = importlib.import_module(mod_path, __name__)
+    val = getattr(mod, name)
+    # Cache on the package so later lookups bypass __getattr__
+    globals()[name] = val
+    return val
+
+
+def __dir__():
+    # Resolved names are cached in globals(), so de-duplicate
+    return list(dict.fromkeys([*globals(), *_LAZY]))
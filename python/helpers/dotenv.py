@@ -3,12 +3,59 @@ Environment variable management for Agent2000.
 Provides functionality to load environment variables from .env files.
 """
 import os
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Tuple
+
+# Parsed .env contents keyed by absolute path, stored with the file's
+# (mtime in ns, size) at parse time; editing the file changes either one
+# and invalidates the entry, even within one mtime tick
+_DOTENV_CACHE: Dict[str, Tuple[Tuple[int, int], List[Tuple[str, str]]]] = {}
+
+# Recognised boolean spellings for get_env_bool
+_BOOL_MAP: Dict[str, bool] = {
+    'true': True, '1': True, 't': True, 'y': True, 'yes': True,
+    'false': False, '0': False, 'f': False, 'n': False, 'no': False,
+}
+
+def _parse_dotenv(data: str) -> List[Tuple[str, str]]:
+    """
+    Parse the contents of a .env file into (key, value) pairs.
+    
+    Args:
+        data: The raw file contents.
+        
+    Returns:
+        List of (variable name, unquoted value) pairs in file order,
+        including repeated keys.
+    """
+    values: List[Tuple[str, str]] = []
+    for line in data.splitlines():
+        line = line.strip()
+        # Skip comments and empty lines
+        if not line or line[0] == '#':
+            continue
+            
+        # Parse key-value pairs
+        key, sep, value = line.partition('=')
+        if not sep:
+            continue
+        key = key.strip()
+        value = value.strip()
+        
+        # Remove quotes if present
+        if (value.startswith('"') and value.endswith('"')) or \
+           (value.startswith("'") and value.endswith("'")):
+            value = value[1:-1]
+        
+        values.append((key, value))
+    return values
 
 def load_dotenv(filepath: Optional[str] = None, override: bool = False) -> bool:
     """
     Load environment variables from a .env file.
     
+    Parsed contents are cached per file and modification time, so repeated
+    calls for an unchanged file skip reading and parsing it again.
+    
     Args:
         filepath: Path to the .env file. If None, looks for .env in the current directory.
         override: Whether to override existing environment variables.
@@ -20,27 +67,25 @@ def load_dotenv(filepath: Optional[str] = None, override: bool = False) -> bool:
         filepath = os.path.join(os.getcwd(), '.env')
     
     try:
-        with open(filepath, 'r') as f:
-            for line in f:
-                line = line.strip()
-                # Skip comments and empty lines
-                if not line or line.startswith('#'):
-                    continue
-                    
-                # Parse key-value pairs
-                if '=' in line:
-                    key, value = line.split('=', 1)
-                    key = key.strip()
-                    value = value.strip()
-                    
-                    # Remove quotes if present
-                    if (value.startswith('"') and value.endswith('"')) or \
-                       (value.startswith("'") and value.endswith("'")):
-                        value = value[1:-1]
-                    
-                    # Set environment variable if not already set or if override is True
-                    if override or key not in os.environ:
-                        os.environ[key] = value
+        abspath = os.path.abspath(filepath)
+        st = os.stat(abspath)
+        stamp = (st.st_mtime_ns, st.st_size)
+        cached = _DOTENV_CACHE.get(abspath)
+        if cached is not None and cached[0] == stamp:
+            values = cached[1]
+        else:
+            with open(abspath, 'r', encoding='utf-8') as f:
+                values = _parse_dotenv(f.read())
+            _DOTENV_CACHE[abspath] = (stamp, values)
+        
+        # Set environment variables if not already set or if override is True;
+        # for a repeated key that makes the first value win unless overriding
+        env = os.environ
+        if override:
+            env.update(values)
+        else:
+            for key, value in values:
+                env.setdefault(key, value)
         return True
     except FileNotFoundError:
         return False
@@ -72,12 +117,7 @@ def get_env_bool(key: str, default: bool = False) -> bool:
     Returns:
         The boolean value of the environment variable or the default value.
     """
-    value = os.environ.get(key, '').lower()
-    if value in ('true', '1', 't', 'y', 'yes'):
-        return True
-    elif value in ('false', '0', 'f', 'n', 'no'):
-        return False
-    return default
+    return _BOOL_MAP.get(os.environ.get(key, '').lower(), default)
 
 def get_env_int(key: str, default: int = 0) -> int:
     """
@@ -1,11 +1,23 @@
 """
 Custom exception classes and error handling utilities for the Agent2000 application.
 """
-from typing import Any, Dict, Optional, Type, TypeVar, Union
+import builtins
+from typing import Any, Callable, Dict, Optional, Tuple, Type, TypeVar, Union
+
+# The TimeoutError class below shadows the builtin; keep a handle on it
+_builtin_TimeoutError = builtins.TimeoutError
 
 # Type variable for exception classes
 E = TypeVar('E', bound='BaseError')
 
+
+def _rebuild_error(cls: Type[E], args: Tuple[Any, ...]) -> E:
+    """Recreate an error for unpickling without calling its __init__."""
+    error = cls.__new__(cls)
+    error.args = args
+    return error
+
+
 class BaseError(Exception):
     """Base class for all custom exceptions in the application."""
     
@@ -42,10 +54,16 @@ class BaseError(Exception):
                 'code': self.code,
                 'message': self.message,
                 'details': self.details,
-                'type': self.__class__.__name__
+                'type': type(self).__name__
             }
         }
     
+    def __reduce__(self) -> Tuple[Any, ...]:
+        # Exception's default __reduce__ calls cls(*self.args), which
+        # subclasses such as NotFoundError would misread as their own
+        # first parameter; the attributes are restored from __dict__
+        return (_rebuild_error, (type(self), self.args), self.__dict__)
+    
     @classmethod
     def from_exception(
         cls: Type[E], 
@@ -55,13 +73,19 @@ class BaseError(Exception):
         **details: Any
     ) -> E:
         """Create an error from an existing exception."""
+        # Copy the source's details at most once; **details is already a
+        # fresh dict, so it can be used as-is when there is nothing to merge
+        base_details = getattr(exc, 'details', None)
+        if base_details:
+            merged = dict(base_details)
+            merged.update(details)
+        else:
+            merged = details
+        
         return cls(
             message=message or str(exc),
             code=code or getattr(exc, 'code', None) or 'internal_error',
-            details={
-                **getattr(exc, 'details', {}),
-                **details
-            },
+            details=merged,
             cause=exc
         )
 
@@ -149,6 +173,38 @@ class ServiceUnavailableError(BaseError):
         )
 
 
+def _timeout_error(error: Exception, default_message: str, **context: Any) -> BaseError:
+    return TimeoutError(str(error) or default_message, **context)
+
+
+def _network_error(error: Exception, default_message: str, **context: Any) -> BaseError:
+    return NetworkError(str(error) or "Network operation failed", **context)
+
+
+def _validation_error(error: Exception, default_message: str, **context: Any) -> BaseError:
+    return ValidationError(str(error) or "Invalid data provided", **context)
+
+
+def _configuration_error(error: Exception, default_message: str, **context: Any) -> BaseError:
+    return ConfigurationError(
+        f"Failed to import required module: {str(error) or 'Unknown module'}",
+        **context
+    )
+
+
+# Map standard exceptions to factories for our custom errors; handle_error
+# walks the error's MRO so subclasses resolve to their nearest entry
+_DISPATCH: Dict[Type[BaseException], Callable[..., BaseError]] = {
+    _builtin_TimeoutError: _timeout_error,
+    ConnectionError: _network_error,
+    OSError: _network_error,
+    ValueError: _validation_error,
+    TypeError: _validation_error,
+    AttributeError: _validation_error,
+    ImportError: _configuration_error,
+}
+
+
 def handle_error(
     error: Exception, 
     default_message: str = "An unexpected error occurred",
@@ -169,20 +225,10 @@ def handle_error(
         return error
     
     # Map standard exceptions to our custom errors
-    if isinstance(error, TimeoutError):
-        return TimeoutError(str(error) or default_message, **context)
-    
-    if isinstance(error, (ConnectionError, OSError)):
-        return NetworkError(str(error) or "Network operation failed", **context)
-    
-    if isinstance(error, (ValueError, TypeError, AttributeError)):
-        return ValidationError(str(error) or "Invalid data provided", **context)
-    
-    if isinstance(error, ImportError):
-        return ConfigurationError(
-            f"Failed to import required module: {str(error) or 'Unknown module'}",
-            **context
-        )
+    for cls in type(error).__mro__:
+        factory = _DISPATCH.get(cls)
+        if factory is not None:
+            return factory(error, default_message, **context)
     
     # Fall back to a generic error
     return BaseError(
@@ -1,11 +1,84 @@
 """
 Tools for extracting and processing data from various sources.
 """
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
 import re
 import json
 from pathlib import Path
 
+# Pre-compiled patterns used by the extractors below
+_URL_RE = re.compile(r'https?://\S+')
+_EMAIL_RE = re.compile(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}')
+_PHONE_RE = re.compile(r'\+?[\d\s-]+\(?[\d\s-]+\)?[\d\s-]+\d')
+_HASHTAG_RE = re.compile(r'#(\w+)')
+_MENTION_RE = re.compile(r'@(\w+)')
+# Characters that can change the JSON scanner's state
+_JSON_STRUCT_RE = re.compile(r'[\[\]{}"\\]')
+
+
+def _find_json_spans(text: str) -> Iterator[Tuple[int, int]]:
+    """Find the outermost balanced ``{...}``/``[...]`` spans in a string.
+    
+    Single linear pass tracking bracket depth, jumping between structural
+    characters; brackets inside JSON string literals are ignored. Each span
+    is yielded as soon as it closes, so callers can stop at the first one
+    they accept. Spans nested inside an opener that never closes are still
+    reported, once that opener is known to be abandoned.
+    
+    Args:
+        text: Input text potentially containing JSON
+        
+    Yields:
+        (start, end) slice bounds in left-to-right order
+    """
+    # Closed spans still inside an open bracket, pending its outcome
+    pending: List[Tuple[int, int]] = []
+    starts: List[int] = []
+    closers: List[str] = []
+    in_str = False
+    escape_at = -1
+    
+    for m in _JSON_STRUCT_RE.finditer(text):
+        i = m.start()
+        ch = text[i]
+        if in_str:
+            if i == escape_at:
+                continue
+            if ch == '\\':
+                escape_at = i + 1
+            elif ch == '"':
+                in_str = False
+        elif ch == '{' or ch == '[':
+            starts.append(i)
+            closers.append('}' if ch == '{' else ']')
+        elif not closers:
+            continue
+        elif ch == '"':
+            in_str = True
+        elif ch == '}' or ch == ']':
+            if ch != closers[-1]:
+                # Mismatched closer: abandon the current candidate, leaving
+                # the spans found inside it outermost
+                yield from pending
+                pending.clear()
+                starts.clear()
+                closers.clear()
+                continue
+            closers.pop()
+            start = starts.pop()
+            if not closers:
+                # Back at depth 0: this span encloses everything pending
+                pending.clear()
+                yield (start, i + 1)
+                continue
+            # Drop previously found spans that this one encloses
+            while pending and pending[-1][0] > start:
+                pending.pop()
+            pending.append((start, i + 1))
+    
+    # Openers that never closed
+    yield from pending
+
 
 def extract_json_from_text(text: str) -> Union[Dict, List, None]:
     """Extract JSON object or array from a string.
@@ -16,13 +89,11 @@ def extract_json_from_text(text: str) -> Union[Dict, List, None]:
     Returns:
         Parsed JSON object/array or None if no valid JSON found
     """
-    # Try to find JSON object or array using regex
-    json_match = re.search(r'\{(?:[^{}]|\{(?:[^{}]|\{[^{}]*\})*\})*\}|\[[^\]]*\]', text, re.DOTALL)
-    if json_match:
+    for start, end in _find_json_spans(text):
         try:
-            return json.loads(json_match.group(0))
-        except json.JSONDecodeError:
-            pass
+            return json.loads(text[start:end])
+        except (json.JSONDecodeError, RecursionError):
+            continue
     return None
 
 
@@ -36,8 +107,7 @@ def extract_urls(text: str) -> List[str]:
         List of URLs found in the text
     """
     # Simple URL regex pattern
-    url_pattern = r'https?://\S+'
-    return re.findall(url_pattern, text)
+    return _URL_RE.findall(text)
 
 
 def extract_emails(text: str) -> List[str]:
@@ -50,8 +120,7 @@ def extract_emails(text: str) -> List[str]:
         List of email addresses found in the text
     """
     # Simple email regex pattern
-    email_pattern = r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}'
-    return re.findall(email_pattern, text)
+    return _EMAIL_RE.findall(text)
 
 
 def extract_phone_numbers(text: str) -> List[str]:
@@ -64,8 +133,7 @@ def extract_phone_numbers(text: str) -> List[str]:
         List of phone numbers found in the text
     """
     # Simple phone number pattern (supports various formats)
-    phone_pattern = r'\+?[\d\s-]+\(?[\d\s-]+\)?[\d\s-]+\d'
-    return re.findall(phone_pattern, text)
+    return _PHONE_RE.findall(text)
 
 
 def extract_hashtags(text: str) -> List[str]:
@@ -78,8 +146,7 @@ def extract_hashtags(text: str) -> List[str]:
         List of hashtags (without the # symbol)
     """
     # Extract hashtags (words starting with #)
-    hashtag_pattern = r'#(\w+)'
-    return re.findall(hashtag_pattern, text)
+    return _HASHTAG_RE.findall(text)
 
 
 def extract_mentions(text: str) -> List[str]:
@@ -92,8 +159,7 @@ def extract_mentions(text: str) -> List[str]:
         List of mentions (without the @ symbol)
     """
     # Extract mentions (words starting with @)
-    mention_pattern = r'@(\w+)'
-    return re.findall(mention_pattern, text)
+    return _MENTION_RE.findall(text)
 
 
 def extract_file_extension(filename: str) -> str:
@@ -118,10 +184,14 @@ def extract_metadata(file_path: str) -> Dict[str, Any]:
         Dictionary containing file metadata
     """
     path = Path(file_path)
+    try:
+        st = path.stat()
+    except OSError:
+        st = None
     return {
         'filename': path.name,
         'extension': extract_file_extension(path.name),
-        'size': path.stat().st_size if path.exists() else 0,
-        'created': path.stat().st_ctime if path.exists() else None,
-        'modified': path.stat().st_mtime if path.exists() else None,
+        'size': st.st_size if st is not None else 0,
+        'created': st.st_ctime if st is not None else None,
+        'modified': st.st_mtime if st is not None else None,
     }
@@ -1,12 +1,20 @@
 """
 File handling utilities for the Agent2000 application.
+
+hashlib, shutil and mimetypes are imported inside the helpers that need
+them so importing this module stays cheap.
 """
 import os
-import shutil
-import hashlib
-import mimetypes
+import stat
 from pathlib import Path
-from typing import BinaryIO, Generator, Optional, Tuple, Union, List, Dict, Any
+from typing import BinaryIO, Generator, Optional, Set, Tuple, Union, List, Dict, Any
+
+# Files at least this large are memory-mapped by read_file_chunks
+_MMAP_THRESHOLD = 8 << 20
+
+# Parent directories write_file has already created, to skip repeat mkdirs
+_known_dirs: Set[Path] = set()
+_KNOWN_DIRS_LIMIT = 1024
 
 
 def ensure_dir(directory: Union[str, Path]) -> Path:
@@ -32,8 +40,11 @@ def file_exists(file_path: Union[str, Path]) -> bool:
     Returns:
         True if the file exists and is a file, False otherwise
     """
-    path = Path(file_path)
-    return path.exists() and path.is_file()
+    try:
+        return stat.S_ISREG(os.stat(file_path).st_mode)
+    except (OSError, ValueError):
+        # Missing, not a directory, symlink loop, embedded NUL, ...
+        return False
 
 
 def dir_exists(directory: Union[str, Path]) -> bool:
@@ -45,8 +56,11 @@ def dir_exists(directory: Union[str, Path]) -> bool:
     Returns:
         True if the directory exists and is a directory, False otherwise
     """
-    path = Path(directory)
-    return path.exists() and path.is_dir()
+    try:
+        return stat.S_ISDIR(os.stat(directory).st_mode)
+    except (OSError, ValueError):
+        # Missing, not a directory, symlink loop, embedded NUL, ...
+        return False
 
 
 def get_file_size(file_path: Union[str, Path]) -> int:
@@ -62,23 +76,38 @@ def get_file_size(file_path: Union[str, Path]) -> int:
 
 
 def get_file_hash(file_path: Union[str, Path], algorithm: str = 'sha256', 
-                 chunk_size: int = 8192) -> str:
+                 chunk_size: int = 1 << 20) -> str:
     """Calculate the hash of a file.
     
+    Uses hashlib.file_digest (Python 3.11+), which runs the read/update
+    loop in C; older interpreters fall back to hashing in chunks.
+    
     Args:
         file_path: Path to the file
         algorithm: Hash algorithm to use (default: 'sha256')
-        chunk_size: Size of chunks to read at a time (default: 8KB)
+        chunk_size: Size of chunks to read at a time when falling back
+            to the Python loop (default: 1MB)
         
     Returns:
         Hex digest of the file's hash
     """
-    hash_func = getattr(hashlib, algorithm.lower(), hashlib.sha256)
-    hasher = hash_func()
+    import hashlib
     
-    with open(file_path, 'rb') as f:
-        for chunk in iter(lambda: f.read(chunk_size), b''):
-            hasher.update(chunk)
+    # Resolve by name so OpenSSL-backed implementations are used where
+    # available; unknown algorithms fall back to sha256
+    name = algorithm.lower()
+    if name not in hashlib.algorithms_available:
+        name = 'sha256'
+    
+    file_digest = getattr(hashlib, 'file_digest', None)
+    if file_digest is not None:
+        with open(file_path, 'rb') as f:
+            return file_digest(f, name).hexdigest()
+    
+    # hashlib accepts the memoryview chunks directly, without copying
+    hasher = hashlib.new(name)
+    for chunk in read_file_chunks(file_path, chunk_size, zero_copy=True):
+        hasher.update(chunk)
     
     return hasher.hexdigest()
 
@@ -92,23 +121,53 @@ def get_mime_type(file_path: Union[str, Path]) -> str:
     Returns:
         MIME type string (e.g., 'text/plain', 'image/jpeg')
     """
+    import mimetypes
+    
     path = Path(file_path)
     mime_type, _ = mimetypes.guess_type(path)
     return mime_type or 'application/octet-stream'
 
 
-def read_file_chunks(file_path: Union[str, Path], 
-                    chunk_size: int = 8192) -> Generator[bytes, None, None]:
+def read_file_chunks(file_path: Union[str, Path], chunk_size: int = 1 << 20,
+                    zero_copy: bool = False
+                    ) -> Generator[Union[bytes, memoryview], None, None]:
     """Read a file in chunks.
     
+    With zero_copy, files of 8MB or more are memory-mapped and yielded as
+    memoryview slices over the mapping, so consumers that accept the buffer
+    protocol (hashlib, file.write, ...) read straight from the page cache.
+    Otherwise chunks are bytes, each chunk_size long except the last.
+    
     Args:
         file_path: Path to the file
-        chunk_size: Size of each chunk in bytes (default: 8KB)
+        chunk_size: Size of each chunk in bytes (default: 1MB). Each chunk
+            is held in memory, so pass a smaller value (e.g. 8192) when
+            memory is tight
+        zero_copy: Whether large files may be yielded as memoryviews
+            (default: False)
         
     Yields:
-        Chunks of file data as bytes
+        Chunks of file data as bytes, or memoryview for mapped files
+        when zero_copy is set
     """
     with open(file_path, 'rb') as f:
+        if zero_copy and os.fstat(f.fileno()).st_size >= _MMAP_THRESHOLD:
+            import mmap
+            
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                with memoryview(mm) as view:
+                    for offset in range(0, len(view), chunk_size):
+                        yield view[offset:offset + chunk_size]
+            finally:
+                try:
+                    mm.close()
+                except BufferError:
+                    # A consumer still holds a chunk; the mapping is
+                    # released once the last view is garbage-collected
+                    pass
+            return
+        
         while True:
             chunk = f.read(chunk_size)
             if not chunk:
@@ -116,13 +175,27 @@ def read_file_chunks(file_path: Union[str, Path],
             yield chunk
 
 
-def write_file(file_path: Union[str, Path], content: Union[str, bytes], 
-              mode: str = 'w', encoding: str = 'utf-8') -> int:
+def _write(path: Path, content: Union[str, bytes, bytearray, memoryview], 
+           mode: str, encoding: str) -> int:
+    """Open a file in the given mode and write content to it."""
+    if 'b' in mode:
+        with open(path, mode) as f:
+            return f.write(content)
+    with open(path, mode, encoding=encoding) as f:
+        return f.write(content)
+
+
+def write_file(file_path: Union[str, Path], 
+               content: Union[str, bytes, bytearray, memoryview], 
+               mode: str = 'w', encoding: str = 'utf-8') -> int:
     """Write content to a file.
     
+    Bytes-like content is always written in binary mode as-is, even if a
+    text mode was requested, rather than being decoded and re-encoded.
+    
     Args:
         file_path: Path where the file should be written
-        content: Content to write (str or bytes)
+        content: Content to write (str or bytes-like)
         mode: Write mode ('w' for text, 'wb' for binary)
         encoding: Text encoding (default: 'utf-8')
         
@@ -130,18 +203,27 @@ def write_file(file_path: Union[str, Path], content: Union[str, bytes],
         Number of bytes written
     """
     path = Path(file_path)
-    path.parent.mkdir(parents=True, exist_ok=True)
+    parent = path.parent
+    if parent not in _known_dirs:
+        parent.mkdir(parents=True, exist_ok=True)
+        if len(_known_dirs) >= _KNOWN_DIRS_LIMIT:
+            _known_dirs.clear()
+        _known_dirs.add(parent)
     
-    if 'b' in mode:
-        if isinstance(content, str):
+    if isinstance(content, str):
+        if 'b' in mode:
             content = content.encode(encoding)
-        with open(path, mode) as f:
-            return f.write(content)
-    else:
-        if isinstance(content, bytes):
-            content = content.decode(encoding)
-        with open(path, mode, encoding=encoding) as f:
-            return f.write(content)
+    elif 'b' not in mode:
+        # 'wt' + 'b' would be an invalid mode
+        mode = mode.replace('t', '') + 'b'
+    
+    try:
+        return _write(path, content, mode, encoding)
+    except FileNotFoundError:
+        # The parent was removed since we created it; recreate and retry
+        _known_dirs.discard(parent)
+        parent.mkdir(parents=True, exist_ok=True)
+        return _write(path, content, mode, encoding)
 
 
 def copy_file(src: Union[str, Path], dst: Union[str, Path], 
@@ -156,6 +238,8 @@ def copy_file(src: Union[str, Path], dst: Union[str, Path],
     Returns:
         True if the file was copied successfully, False otherwise
     """
+    import shutil
+    
     src_path = Path(src)
     dst_path = Path(dst)
     
@@ -195,6 +279,11 @@ def list_files(directory: Union[str, Path], pattern: str = '*',
                recursive: bool = False) -> List[Path]:
     """List files in a directory matching a pattern.
     
+    Simple name patterns are matched with os.scandir, whose directory
+    entries carry the file type without an extra stat per entry. Only
+    regular files (or symlinks to them) are returned.
+    Patterns containing a path separator or '**' go through Path.glob.
+    
     Args:
         directory: Directory to search in
         pattern: Glob pattern to match files (default: '*')
@@ -203,13 +292,63 @@ def list_files(directory: Union[str, Path], pattern: str = '*',
     Returns:
         List of Path objects for matching files
     """
-    path = Path(directory)
-    if not path.exists() or not path.is_dir():
+    if not dir_exists(directory):
         return []
     
-    if recursive:
-        return list(path.rglob(pattern))
-    return list(path.glob(pattern))
+    path = Path(directory)
+    
+    if '/' in pattern or os.sep in pattern or '**' in pattern:
+        matches = path.rglob(pattern) if recursive else path.glob(pattern)
+        return [p for p in matches if p.is_file()]
+    
+    if pattern == '*':
+        match = None
+    else:
+        import re
+        import fnmatch
+        
+        flags = re.IGNORECASE if os.name == 'nt' else 0
+        match = re.compile(fnmatch.translate(pattern), flags).match
+    
+    if not recursive:
+        with os.scandir(path) as entries:
+            return [
+                path / entry.name for entry in entries
+                if _is_file(entry) and (match is None or match(entry.name))
+            ]
+    
+    # Top-down walk in the same order as os.walk (which doesn't follow
+    # directory symlinks either), keeping the DirEntry file types
+    result = []
+    stack = [path]
+    while stack:
+        root_path = stack.pop()
+        subdirs = []
+        try:
+            with os.scandir(root_path) as entries:
+                for entry in entries:
+                    if _is_file(entry):
+                        if match is None or match(entry.name):
+                            result.append(root_path / entry.name)
+                    elif entry.is_dir(follow_symlinks=False):
+                        subdirs.append(root_path / entry.name)
+        except OSError:
+            # Unreadable directory, skipped like os.walk does
+            continue
+        stack.extend(reversed(subdirs))
+    return result
+
+
+def _is_file(entry: os.DirEntry) -> bool:
+    """Whether a directory entry is a regular file (or a link to one).
+    
+    Entries whose type can't be determined, such as symlink loops, are
+    treated as not being files.
+    """
+    try:
+        return entry.is_file()
+    except OSError:
+        return False
 
 
 def get_file_info(file_path: Union[str, Path]) -> Dict[str, Any]:
@@ -222,20 +361,22 @@ def get_file_info(file_path: Union[str, Path]) -> Dict[str, Any]:
         Dictionary containing file information
     """
     path = Path(file_path)
-    if not path.exists() or not path.is_file():
+    try:
+        st = path.stat()
+    except OSError:
+        st = None
+    if st is None or not stat.S_ISREG(st.st_mode):
         raise FileNotFoundError(f"File not found: {file_path}")
     
-    stat = path.stat()
-    
     return {
         'path': str(path.absolute()),
         'name': path.name,
         'parent': str(path.parent.absolute()),
-        'size': stat.st_size,
-        'created': stat.st_ctime,
-        'modified': stat.st_mtime,
-        'accessed': stat.st_atime,
-        'permissions': oct(stat.st_mode)[-3:],
+        'size': st.st_size,
+        'created': st.st_ctime,
+        'modified': st.st_mtime,
+        'accessed': st.st_atime,
+        'permissions': oct(st.st_mode)[-3:],
         'mime_type': get_mime_type(path),
         'is_symlink': path.is_symlink(),
         'is_dir': False,
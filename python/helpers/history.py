@@ -1,25 +1,212 @@
 """
 History tracking and management utilities for the Agent2000 application.
 """
-from datetime import datetime
-from typing import Any, Dict, List, Optional, Union, TypedDict, Callable, TypeVar
+from typing import Any, Deque, Dict, List, Optional, Tuple, Union, Callable, TypeVar
 from pathlib import Path
+from collections import defaultdict, deque
+from collections.abc import Iterator, Mapping
+from itertools import islice
+from operator import itemgetter
+import atexit
 import json
+import mmap
 import os
+import queue
+import re
+import sys
+import threading
+import time
+import weakref
 from dataclasses import dataclass, asdict, field
 from uuid import uuid4
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Type variable for generic functions
 T = TypeVar('T')
 
+# Maximum number of entries the background writer coalesces into one write
+DEFAULT_BATCH_SIZE = 32
+# How long (seconds) the writer waits for a batch to fill before writing it
+WRITE_BATCH_TIMEOUT = 0.1
+# Pending entries beyond this are written synchronously by add_entry
+WRITE_QUEUE_SIZE = 4096
+# How long (seconds) the writer thread idles before exiting; the next
+# write starts a new one
+WRITER_IDLE_TIMEOUT = 5.0
+# Append-only JSON Lines log holding all persisted entries
+HISTORY_FILENAME = "history.jsonl"
+# Offset index over the log: one "timestamp\tid\toffset\tlength" line per entry
+HISTORY_INDEX_FILENAME = "history.idx"
+# Distinct metadata shapes pooled per manager before the pool is reset
+METADATA_POOL_SIZE = 1024
+
+# Queued by flush() to make the writer write its current batch immediately
+_FLUSH = object()
+
+# Managers whose queued entries are flushed at interpreter exit; held
+# weakly so that the exit hook doesn't keep unused managers alive
+_LIVE_MANAGERS: "weakref.WeakSet[HistoryManager]" = weakref.WeakSet()
+
+
+@atexit.register
+def _flush_live_managers() -> None:
+    """Write the entries still queued by any manager."""
+    for manager in list(_LIVE_MANAGERS):
+        manager.flush()
+
+def _json_dumps_line(entry: "HistoryEntry") -> bytes:
+    """Serialize an entry as one UTF-8 JSON line using the stdlib encoder."""
+    return json.dumps(entry.to_dict(), ensure_ascii=False).encode('utf-8') + b'\n'
+
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_APPEND_NEWLINE | orjson.OPT_NON_STR_KEYS
+    
+    def _dumps_line(entry: "HistoryEntry") -> bytes:
+        """Serialize an entry as one UTF-8 JSON line.
+        
+        orjson serializes slots dataclasses natively, field by field.
+        """
+        try:
+            return orjson.dumps(entry, option=_ORJSON_OPTIONS)
+        except TypeError:
+            # e.g. integers beyond 64 bits, which only json handles
+            return _json_dumps_line(entry)
+    
+    # Integer literals this long may be beyond 64 bits, which orjson would
+    # read back as a lossy float; only json reads those exactly
+    _LONG_DIGITS = re.compile(rb'\d{19}')
+    
+    def _loads(data: bytes) -> Any:
+        """Parse a JSON document, using json for ones orjson can't read exactly."""
+        if _LONG_DIGITS.search(data):
+            return json.loads(data)
+        return orjson.loads(data)
+else:
+    _dumps_line = _json_dumps_line
+    _loads = json.loads
+
+
+# (epoch second, formatted 'YYYY-MM-DDTHH:MM:SS') of the last timestamp
+_timestamp_cache = (-1, '')
+
+
+def _utc_timestamp() -> str:
+    """Return the current UTC time as an ISO 8601 string with microseconds.
+    
+    Equivalent to datetime.utcnow().isoformat() (but always including the
+    fractional part); the seconds prefix is formatted once per second.
+    """
+    global _timestamp_cache
+    sec, ns = divmod(time.time_ns(), 1_000_000_000)
+    cached_sec, prefix = _timestamp_cache
+    if sec != cached_sec:
+        prefix = time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(sec))
+        _timestamp_cache = (sec, prefix)
+    return f"{prefix}.{ns // 1000:06d}"
+
+
+
+class _FrozenDict(dict):
+    """Read-only dict, used for metadata shared between history entries."""
+    __slots__ = ()
+    
+    def _readonly(self, *args: Any, **kwargs: Any) -> None:
+        raise TypeError("history entry metadata is shared and read-only")
+    
+    __setitem__ = __delitem__ = __ior__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+    
+    def __reduce__(self) -> Any:
+        return (_FrozenDict, (dict(self),))
+
+
+_EMPTY_METADATA = _FrozenDict()
+# Metadata value types that _pool_metadata shares between entries
+_POOLABLE_TYPES = frozenset((str, int, float, bool, type(None)))
+
 
-class HistoryEntry(TypedDict, total=False):
-    """Represents a single entry in the history."""
+# Fields of a HistoryEntry, in serialization order
+_ENTRY_FIELDS = ('id', 'timestamp', 'type', 'data', 'metadata')
+# Keys a stored entry must have to be loaded (metadata is optional)
+_REQUIRED_KEYS = frozenset(('id', 'timestamp', 'type', 'data'))
+
+
+@dataclass(slots=True)
+class HistoryEntry(Mapping):
+    """Represents a single entry in the history.
+    
+    Entries are also read-only mappings over their fields (``entry['type']``,
+    ``entry.get('metadata')``, ``dict(entry)``), so code written against
+    the old dict entries keeps working. Use to_dict() to serialize one.
+    """
     id: str
     timestamp: str
     type: str
     data: Dict[str, Any]
-    metadata: Dict[str, Any]
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    
+    def __getitem__(self, key: str) -> Any:
+        if key not in _ENTRY_FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+    
+    def __contains__(self, key: object) -> bool:
+        return key in _ENTRY_FIELDS
+    
+    def __iter__(self) -> Iterator[str]:
+        return iter(_ENTRY_FIELDS)
+    
+    def __len__(self) -> int:
+        return len(_ENTRY_FIELDS)
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        """Return the named field, or default if there is no such field."""
+        if key not in _ENTRY_FIELDS:
+            return default
+        return getattr(self, key)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the entry as a plain dict (shallow, unlike asdict)."""
+        return {
+            'id': self.id,
+            'timestamp': self.timestamp,
+            'type': self.type,
+            'data': self.data,
+            'metadata': self.metadata
+        }
+    
+    @classmethod
+    def from_dict(
+        cls,
+        data: Dict[str, Any],
+        pool_metadata: Optional[Callable[[Optional[Dict[str, Any]]], Dict[str, Any]]] = None
+    ) -> "HistoryEntry":
+        """Create an entry from a dict as stored on disk.
+        
+        The metadata becomes read-only, as for entries made by add_entry.
+        
+        Args:
+            data: The stored entry
+            pool_metadata: Optional hook returning a shared copy of the
+                metadata, e.g. HistoryManager._pool_metadata
+        """
+        metadata = data.get('metadata')
+        if pool_metadata is not None:
+            metadata = pool_metadata(metadata)
+        else:
+            metadata = _FrozenDict(metadata) if metadata else _EMPTY_METADATA
+        return cls(
+            id=data['id'],
+            timestamp=data['timestamp'],
+            type=sys.intern(data['type']),
+            data=data['data'],
+            metadata=metadata
+        )
 
 
 @dataclass
@@ -42,10 +229,26 @@ class HistoryManager:
             config: Configuration for history management. If None, uses defaults.
         """
         self.config = config or HistoryConfig()
-        self.entries: List[HistoryEntry] = []
+        # Appended at the tail and pruned from the head, both O(1)
+        self.entries: Deque[HistoryEntry] = deque()
+        # Lookup indexes over self.entries, kept in sync on every mutation
+        self._id_index: Dict[str, HistoryEntry] = {}
+        self._type_index: Dict[str, Deque[HistoryEntry]] = defaultdict(deque)
+        # Canonical (sorted (key, type, value) items) -> shared read-only metadata
+        self._metadata_pool: Dict[tuple, Dict[str, Any]] = {}
         self._filters: Dict[str, Callable[[HistoryEntry], bool]] = {}
         self._listeners: List[Callable[[HistoryEntry], None]] = []
         
+        # Persistence is handled by a background writer started on first use
+        # Holds entries, plus _FLUSH markers and a None stop sentinel
+        self._write_queue: "queue.Queue[Any]" = queue.Queue(maxsize=WRITE_QUEUE_SIZE)
+        self._writer: Optional[threading.Thread] = None
+        self._writer_lock = threading.Lock()
+        # Serializes appends to the log with rewrites done by prune_entries
+        self._file_lock = threading.Lock()
+        # id -> (offset, length) in the log, read from the index on demand
+        self._disk_index: Optional[Dict[str, Tuple[int, int]]] = None
+        
         # Create storage directory if needed
         if self.config.persist_to_disk:
             os.makedirs(self.config.storage_path, exist_ok=True)
@@ -58,6 +261,9 @@ class HistoryManager:
     ) -> str:
         """Add a new entry to the history.
         
+        Identical metadata is shared between entries, so the stored
+        metadata dict is read-only.
+        
         Args:
             entry_type: Type/category of the entry
             data: The main data for the entry
@@ -66,27 +272,28 @@ class HistoryManager:
         Returns:
             The ID of the created entry
         """
-        entry_id = str(uuid4())
-        now = datetime.utcnow().isoformat()
-        
-        entry: HistoryEntry = {
-            'id': entry_id,
-            'timestamp': now,
-            'type': entry_type,
-            'data': data,
-            'metadata': metadata or {}
-        }
+        entry_id = uuid4().hex
+        now = _utc_timestamp()
+        
+        entry = HistoryEntry(
+            id=entry_id,
+            timestamp=now,
+            type=sys.intern(entry_type),
+            data=data,
+            metadata=self._pool_metadata(metadata)
+        )
         
         self.entries.append(entry)
+        self._index_entry(entry)
+        
+        # Persist to disk if enabled (before pruning, which rotates the log)
+        if self.config.persist_to_disk:
+            self._save_entry(entry)
         
         # Prune old entries if needed
         if self.config.auto_prune and len(self.entries) > self.config.prune_threshold:
             self.prune_entries()
         
-        # Persist to disk if enabled
-        if self.config.persist_to_disk:
-            self._save_entry(entry)
-        
         # Notify listeners
         for listener in self._listeners:
             try:
@@ -97,6 +304,35 @@ class HistoryManager:
         
         return entry_id
     
+    def _pool_metadata(self, metadata: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Return a shared read-only copy of metadata equal to the given one.
+        
+        Only metadata with scalar values is pooled; anything else (e.g.
+        containers) is copied as is.
+        """
+        if not metadata:
+            return _EMPTY_METADATA
+        # Values that compare equal but differ in type (1, True, 1.0) hash
+        # alike, so the type is part of the key
+        key = []
+        for k, v in metadata.items():
+            value_type = type(v)
+            if value_type not in _POOLABLE_TYPES:
+                return _FrozenDict(metadata)
+            key.append((k, value_type, v))
+        try:
+            key.sort()
+        except TypeError:
+            # Keys of mixed types can't be ordered
+            return _FrozenDict(metadata)
+        key = tuple(key)
+        pooled = self._metadata_pool.get(key)
+        if pooled is None:
+            if len(self._metadata_pool) >= METADATA_POOL_SIZE:
+                self._metadata_pool.clear()
+            pooled = self._metadata_pool[key] = _FrozenDict(metadata)
+        return pooled
+    
     def get_entry(self, entry_id: str) -> Optional[HistoryEntry]:
         """Get an entry by its ID.
         
@@ -106,10 +342,7 @@ class HistoryManager:
         Returns:
             The entry if found, None otherwise
         """
-        for entry in self.entries:
-            if entry.get('id') == entry_id:
-                return entry
-        return None
+        return self._id_index.get(entry_id)
     
     def get_entries(
         self, 
@@ -121,30 +354,36 @@ class HistoryManager:
         
         Args:
             entry_type: If provided, only return entries of this type
-            limit: Maximum number of entries to return
+            limit: Maximum number of (most recent) entries to return
             reverse: If True, return entries in reverse chronological order
             
         Returns:
             List of matching history entries
         """
+        # Entries (and the type buckets) are kept in chronological order,
+        # so no sorting is needed here
         result = self.entries
         
         # Filter by type if specified
         if entry_type is not None:
-            result = [e for e in result if e.get('type') == entry_type]
+            result = self._type_index.get(entry_type, deque())
         
-        # Apply registered filters
-        for filter_func in self._filters.values():
-            result = [e for e in result if filter_func(e)]
-        
-        # Sort by timestamp
-        result.sort(key=lambda e: e.get('timestamp', ''), reverse=not reverse)
+        filters = tuple(self._filters.values())
         
-        # Apply limit
+        # Apply limit, walking back from the newest entry; filters run
+        # lazily so only as many entries are tested as the limit needs
         if limit is not None and limit > 0:
-            result = result[-limit:] if not reverse else result[:limit]
+            candidates = reversed(result)
+            if filters:
+                candidates = (e for e in candidates if all(f(e) for f in filters))
+            newest = list(islice(candidates, limit))
+            return newest if reverse else newest[::-1]
+        
+        # Apply registered filters
+        for filter_func in filters:
+            result = [e for e in result if filter_func(e)]
         
-        return result
+        return list(reversed(result)) if reverse else list(result)
     
     def add_filter(self, name: str, filter_func: Callable[[HistoryEntry], bool]) -> None:
         """Add a filter function to apply to all queries.
@@ -194,45 +433,426 @@ class HistoryManager:
         """
         if len(self.entries) <= self.config.max_entries:
             return 0
-            
-        # Sort entries by timestamp (oldest first)
-        self.entries.sort(key=lambda e: e.get('timestamp', ''))
         
         # Calculate how many to remove
         remove_count = len(self.entries) - self.config.max_entries
         
         # Remove the oldest entries
-        self.entries = self.entries[remove_count:]
+        popleft = self.entries.popleft
+        for _ in range(remove_count):
+            self._unindex_entry(popleft())
+        
+        # Rotate the log so it only holds the newest entries; entries from
+        # earlier sessions count too, whether or not they were loaded
+        if self.config.persist_to_disk:
+            self.flush()
+            self._rotate_log(self.config.max_entries)
         
         return remove_count
     
     def clear(self) -> None:
         """Clear all history entries."""
-        self.entries = []
+        self.entries.clear()
+        self._rebuild_indexes()
+    
+    def _index_entry(self, entry: HistoryEntry) -> None:
+        """Add an entry to the id and type indexes."""
+        self._id_index[entry.id] = entry
+        self._type_index[entry.type].append(entry)
+    
+    def _unindex_entry(self, entry: HistoryEntry) -> None:
+        """Remove an entry from the id and type indexes."""
+        self._id_index.pop(entry.id, None)
+        entry_type = entry.type
+        bucket = self._type_index.get(entry_type)
+        if bucket:
+            # Pruning always removes the oldest entry, i.e. the bucket head
+            if bucket[0] is entry:
+                bucket.popleft()
+            else:
+                bucket.remove(entry)
+            if not bucket:
+                del self._type_index[entry_type]
+    
+    def _rebuild_indexes(self) -> None:
+        """Rebuild the id and type indexes from self.entries."""
+        self._id_index = {}
+        self._type_index = defaultdict(deque)
+        for entry in self.entries:
+            self._index_entry(entry)
     
     def _save_entry(self, entry: HistoryEntry) -> bool:
-        """Save an entry to disk.
+        """Queue an entry to be written to disk by the background writer.
+        
+        If the queue is full the entry is written synchronously instead.
         
         Args:
             entry: The entry to save
             
         Returns:
-            True if saved successfully, False otherwise
+            True if queued or saved successfully, False otherwise
         """
         try:
-            # Create a filename based on timestamp and ID
-            timestamp = entry.get('timestamp', '').replace(':', '-').replace('.', '-')
-            filename = f"{timestamp}_{entry.get('id')}.json"
-            filepath = os.path.join(self.config.storage_path, filename)
+            self._write_queue.put_nowait(entry)
+        except queue.Full:
+            return self._write_batch([entry])
+        self._start_writer()
+        return True
+    
+    def _start_writer(self) -> None:
+        """Start the background writer thread if it isn't running.
+        
+        Called after queueing. The check takes the lock so it can't
+        interleave with an idle writer deciding to exit, which would
+        leave the new item without a reader.
+        """
+        with self._writer_lock:
+            if self._writer is None:
+                self._writer = threading.Thread(
+                    target=self._writer_loop,
+                    name="HistoryWriter",
+                    daemon=True
+                )
+                self._writer.start()
+                _LIVE_MANAGERS.add(self)
+    
+    def _writer_loop(self) -> None:
+        """Drain the write queue, writing entries in batches.
+        
+        Exits after WRITER_IDLE_TIMEOUT without work, so an idle manager
+        holds no thread (and the thread no reference to the manager).
+        """
+        write_queue = self._write_queue
+        while True:
+            try:
+                item = write_queue.get(timeout=WRITER_IDLE_TIMEOUT)
+            except queue.Empty:
+                with self._writer_lock:
+                    if write_queue.empty():
+                        if self._writer is threading.current_thread():
+                            self._writer = None
+                        return
+                continue
+            received = 1
+            batch: List[HistoryEntry] = []
+            stop = False
+            deadline = time.monotonic() + WRITE_BATCH_TIMEOUT
             
-            # Write the entry as JSON
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(entry, f, indent=2, ensure_ascii=False)
+            while True:
+                if item is None:
+                    stop = True
+                    break
+                if item is _FLUSH:
+                    break
+                batch.append(item)
+                if len(batch) >= DEFAULT_BATCH_SIZE:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = write_queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                received += 1
+            
+            try:
+                if batch:
+                    self._write_batch(batch)
+            finally:
+                for _ in range(received):
+                    write_queue.task_done()
+            if stop:
+                return
+    
+    def _log_path(self) -> str:
+        """Path of the JSON Lines history log."""
+        return os.path.join(self.config.storage_path, HISTORY_FILENAME)
+    
+    def _index_path(self) -> str:
+        """Path of the offset index over the history log."""
+        return os.path.join(self.config.storage_path, HISTORY_INDEX_FILENAME)
+    
+    @staticmethod
+    def _encode_entries(entries: List[HistoryEntry], offset: int = 0) -> Tuple[bytes, bytes]:
+        """Serialize entries as newline-delimited JSON plus their index lines.
+        
+        Entries that can't be serialized are skipped, so one bad entry
+        doesn't cost the rest of the batch.
+        
+        Args:
+            entries: The entries to serialize
+            offset: Position in the log the serialized entries will start at
+            
+        Returns:
+            The log data and the matching index data
+        """
+        lines = []
+        index = []
+        for entry in entries:
+            try:
+                line = _dumps_line(entry)
+            except Exception:
+                continue
+            lines.append(line)
+            index.append(f"{entry.timestamp}\t{entry.id}\t{offset}\t{len(line)}\n")
+            offset += len(line)
+        return b''.join(lines), ''.join(index).encode('utf-8')
+    
+    def _write_batch(self, entries: List[HistoryEntry]) -> bool:
+        """Append entries to the history log and its index.
+        
+        Args:
+            entries: The entries to write
+            
+        Returns:
+            True if written successfully, False otherwise
+        """
+        try:
+            with self._file_lock:
+                with open(self._log_path(), 'ab') as f:
+                    data, index = self._encode_entries(entries, f.tell())
+                    f.write(data)
+                with open(self._index_path(), 'ab') as f:
+                    f.write(index)
+                self._disk_index = None
+            return True
+        except Exception:
+            return False
+    
+    def _rewrite_log(self, entries: List[HistoryEntry]) -> bool:
+        """Atomically replace the history log and its index with the given entries.
+        
+        Caller holds the file lock, so nothing is appended between reading
+        the entries and replacing the log.
+        
+        Args:
+            entries: The entries the log should contain
+            
+        Returns:
+            True if written successfully, False otherwise
+        """
+        try:
+            self._replace_log(*self._encode_entries(entries))
+            return True
+        except Exception:
+            return False
+    
+    def _replace_log(self, data: bytes, index: bytes) -> None:
+        """Atomically replace the log and its index. Caller holds the file lock."""
+        log_path = self._log_path()
+        index_path = self._index_path()
+        with open(log_path + '.tmp', 'wb') as f:
+            f.write(data)
+        with open(index_path + '.tmp', 'wb') as f:
+            f.write(index)
+        # A crash between the two leaves a stale index, which
+        # _read_index detects and load_from_disk then rebuilds
+        os.replace(log_path + '.tmp', log_path)
+        os.replace(index_path + '.tmp', index_path)
+        self._disk_index = None
+    
+    def _rotate_log(self, keep: int) -> bool:
+        """Trim the history log to its newest entries.
+        
+        The retained lines are copied as is, without decoding them. If the
+        index is missing or stale the log is decoded instead.
+        
+        Args:
+            keep: Number of (most recent) entries to retain
+            
+        Returns:
+            True if written successfully, False otherwise
+        """
+        try:
+            with self._file_lock:
+                index = self._read_index()
+                if index is None:
+                    entries = self._scan_log()
+                    entries.sort(key=lambda e: e.timestamp)
+                    return self._rewrite_log(entries[max(len(entries) - keep, 0):])
+                if len(index) <= keep:
+                    return True
                 
+                # Stable, so entries sharing a timestamp keep their log order
+                index.sort(key=itemgetter(0))
+                lines = []
+                new_index = []
+                offset = 0
+                with open(self._log_path(), 'rb') as f, \
+                        mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    for timestamp, entry_id, start, length in index[len(index) - keep:]:
+                        lines.append(mm[start:start + length])
+                        new_index.append(f"{timestamp}\t{entry_id}\t{offset}\t{length}\n")
+                        offset += length
+                self._replace_log(b''.join(lines), ''.join(new_index).encode('utf-8'))
             return True
         except Exception:
             return False
     
+    def _read_index(self) -> Optional[List[Tuple[str, str, int, int]]]:
+        """Read the offset index. Caller holds the file lock.
+        
+        Returns:
+            (timestamp, id, offset, length) tuples in log order, or None if
+            the index is missing or doesn't exactly cover the log
+        """
+        try:
+            log_size = os.path.getsize(self._log_path())
+        except FileNotFoundError:
+            return []
+        try:
+            with open(self._index_path(), 'rb') as f:
+                lines = f.read().decode('utf-8').splitlines()
+        except FileNotFoundError:
+            return None
+        
+        index = []
+        end = 0
+        try:
+            for line in lines:
+                timestamp, entry_id, offset, length = line.split('\t')
+                offset = int(offset)
+                length = int(length)
+                # Entries must tile the log with no gaps or overlaps
+                if offset != end:
+                    return None
+                end = offset + length
+                index.append((timestamp, entry_id, offset, length))
+        except ValueError:
+            return None
+        return index if end == log_size else None
+    
+    def _load_indexed(self, index: List[Tuple[str, str, int, int]]) -> Optional[List[HistoryEntry]]:
+        """Decode the indexed entries from the memory-mapped log.
+        
+        Caller holds the file lock. Returns None if any slice doesn't hold
+        the entry the index says it does.
+        """
+        if not index:
+            return []
+        # Sorting the small index tuples puts entries in timestamp order
+        # before anything is decoded (stable, so ties keep their log order)
+        index.sort(key=itemgetter(0))
+        entries = []
+        with open(self._log_path(), 'rb') as f, \
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for _, entry_id, offset, length in index:
+                try:
+                    entry = _loads(mm[offset:offset + length])
+                except ValueError:
+                    return None
+                if not self._is_valid_entry(entry) or entry['id'] != entry_id:
+                    return None
+                entries.append(HistoryEntry.from_dict(entry, self._pool_metadata))
+        return entries
+    
+    def _scan_log(self) -> List[HistoryEntry]:
+        """Decode the history log line by line, skipping unreadable lines."""
+        entries = []
+        try:
+            with open(self._log_path(), 'rb') as f:
+                for line in f:
+                    try:
+                        entry = _loads(line)
+                    except ValueError:
+                        continue
+                    if self._is_valid_entry(entry):
+                        entries.append(HistoryEntry.from_dict(entry, self._pool_metadata))
+        except FileNotFoundError:
+            pass
+        return entries
+    
+    def _load_log(self) -> List[HistoryEntry]:
+        """Read all entries from the history log, in timestamp order."""
+        with self._file_lock:
+            index = self._read_index()
+            if index is not None:
+                entries = self._load_indexed(index)
+                if entries is not None:
+                    return entries
+            entries = self._scan_log()
+            
+            # The index was missing or stale (e.g. a log written by an older
+            # version): rewrite the log and a fresh index, dropping bad lines.
+            # Still under the lock, so no batch appended meanwhile is lost
+            entries.sort(key=lambda e: e.timestamp)
+            self._rewrite_log(entries)
+        return entries
+    
+    def load_entry(self, entry_id: str) -> Optional[HistoryEntry]:
+        """Read a single persisted entry from disk by its ID.
+        
+        Only that entry's line is read and decoded, so this works without
+        load_from_disk() loading the whole history into memory.
+        
+        Args:
+            entry_id: The ID of the entry to read
+            
+        Returns:
+            The entry if found, None if it isn't on disk or the index is
+            missing or stale (load_from_disk rebuilds it)
+        """
+        if not self.config.persist_to_disk:
+            return None
+        
+        # Make sure queued entries are on disk before reading them back
+        self.flush()
+        
+        with self._file_lock:
+            disk_index = self._disk_index
+            if disk_index is None:
+                index = self._read_index()
+                if index is None:
+                    return None
+                disk_index = self._disk_index = {
+                    key: (offset, length) for _, key, offset, length in index
+                }
+            location = disk_index.get(entry_id)
+            if location is None:
+                return None
+            offset, length = location
+            with open(self._log_path(), 'rb') as f:
+                f.seek(offset)
+                data = f.read(length)
+        
+        try:
+            entry = _loads(data)
+        except ValueError:
+            return None
+        if not self._is_valid_entry(entry) or entry['id'] != entry_id:
+            return None
+        return HistoryEntry.from_dict(entry, self._pool_metadata)
+    
+    def flush(self) -> None:
+        """Block until all queued entries have been written to disk."""
+        if self._writer is not None:
+            self._write_queue.put(_FLUSH)
+            # The writer may have just exited idle; make sure one reads it
+            self._start_writer()
+            self._write_queue.join()
+    
+    def close(self) -> None:
+        """Write any queued entries and stop the background writer.
+        
+        Also called on leaving a ``with HistoryManager(...)`` block.
+        """
+        with self._writer_lock:
+            writer = self._writer
+            self._writer = None
+            if writer is not None:
+                self._write_queue.put(None)
+        _LIVE_MANAGERS.discard(self)
+        # Joined outside the lock, which an idle writer may be waiting on
+        if writer is not None:
+            writer.join()
+    
+    def __enter__(self) -> "HistoryManager":
+        return self
+    
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+    
     def load_from_disk(self) -> int:
         """Load history entries from disk.
         
@@ -241,36 +861,66 @@ class HistoryManager:
         """
         if not self.config.persist_to_disk or not os.path.isdir(self.config.storage_path):
             return 0
-            
-        count = 0
         
+        # Make sure queued entries are on disk before reading them back
+        self.flush()
+        self._migrate_legacy_files()
+        
+        # Skip entries already in memory (this manager persisted them) and
+        # any line duplicated by an interrupted migration
+        known = self._id_index
+        loaded = {}
+        for entry in self._load_log():
+            if entry.id not in known:
+                loaded.setdefault(entry.id, entry)
+        count = len(loaded)
+        if not count:
+            return 0
+        
+        # The log comes back in timestamp order; entries already in memory
+        # need merging, once, so queries never need to sort
+        needs_sort = bool(self.entries)
+        self.entries.extend(loaded.values())
+        if needs_sort:
+            self.entries = deque(sorted(self.entries, key=lambda e: e.timestamp))
+        self._rebuild_indexes()
+                
+        return count
+    
+    def _migrate_legacy_files(self) -> None:
+        """Move entries written one file each by earlier versions into the log.
+        
+        Each file is removed once its entry is in the log, so it is read
+        only once and pruning the log can't bring it back.
+        """
+        entries = []
+        migrated = []
         for filename in os.listdir(self.config.storage_path):
             if not filename.endswith('.json'):
                 continue
                 
             try:
                 filepath = os.path.join(self.config.storage_path, filename)
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    entry = json.load(f)
-                    
-                if self._is_valid_entry(entry):
-                    self.entries.append(entry)
-                    count += 1
+                with open(filepath, 'rb') as f:
+                    entry = _loads(f.read())
             except Exception:
                 continue
-                
-        return count
+            if self._is_valid_entry(entry):
+                entries.append(HistoryEntry.from_dict(entry, self._pool_metadata))
+                migrated.append(filepath)
+        
+        if not entries or not self._write_batch(entries):
+            return
+        for filepath in migrated:
+            try:
+                os.remove(filepath)
+            except OSError:
+                pass
     
     @staticmethod
     def _is_valid_entry(entry: Any) -> bool:
         """Check if an entry has the required fields."""
-        return (
-            isinstance(entry, dict) and
-            'id' in entry and
-            'timestamp' in entry and
-            'type' in entry and
-            'data' in entry
-        )
+        return isinstance(entry, dict) and _REQUIRED_KEYS <= entry.keys()
 
 
 def get_default_history_manager() -> HistoryManager:
@@ -3,9 +3,9 @@ Rate limiting utilities for API requests and other operations.
 """
 import time
 import math
+from array import array
 from typing import Dict, Optional, Tuple, Union, Callable, Any
-from threading import Lock
-from collections import deque
+from threading import Condition
 import logging
 
 logger = logging.getLogger(__name__)
@@ -44,8 +44,10 @@ class RateLimiter:
         self.tokens_per_request = tokens_per_request
         
         # Request-based rate limiting
-        self.requests = deque()
-        self.lock = Lock()
+        self._init_window()
+        # Guards all limiter state (it wraps an RLock); blocked callers wait
+        # on it and are woken by release() or their computed wait time
+        self._cv = Condition()
         
         # Token bucket rate limiting
         self.use_token_bucket = max_tokens is not None
@@ -54,14 +56,14 @@ class RateLimiter:
             self.tokens = max_tokens
             self.token_refill_rate = token_refill_rate
             self.max_token_capacity = max_token_capacity or max_tokens
-            self.last_refill_time = time.time()
+            self.last_refill_time = time.monotonic()
     
     def _refill_tokens(self) -> None:
         """Refill tokens based on the time elapsed since the last refill."""
         if not self.use_token_bucket:
             return
             
-        current_time = time.time()
+        current_time = time.monotonic()
         time_elapsed = current_time - self.last_refill_time
         
         if time_elapsed > 0:
@@ -87,53 +89,101 @@ class RateLimiter:
             return True
         return False
     
+    def _init_window(self) -> None:
+        """Set up the state tracking requests in the time window."""
+        # Timestamps of the requests in the current window, held in a
+        # preallocated ring buffer (oldest at _head)
+        self._ring = array('d', [0.0] * self.max_requests)
+        self._head = 0
+        self._count = 0
+    
     def _cleanup_old_requests(self, current_time: float) -> None:
         """Remove old requests that are outside the time window."""
-        while self.requests and (current_time - self.requests[0] > self.per_seconds):
-            self.requests.popleft()
+        count = self._count
+        if not count:
+            return
+        # Hoist the cutoff and attributes out of the loop; write back once
+        cutoff = current_time - self.per_seconds
+        ring = self._ring
+        head = self._head
+        size = self.max_requests
+        while count and ring[head] < cutoff:
+            head += 1
+            if head == size:
+                head = 0
+            count -= 1
+        self._head = head
+        self._count = count
+    
+    def _requests_in_window(self, current_time: float) -> float:
+        """Return the number of requests counted in the current window."""
+        self._cleanup_old_requests(current_time)
+        return self._count
+    
+    def _record_request(self, current_time: float) -> None:
+        """Record a request made at the given time."""
+        self._ring[(self._head + self._count) % self.max_requests] = current_time
+        self._count += 1
+    
+    def _release_request(self) -> None:
+        """Forget the most recently recorded request."""
+        if self._count:
+            self._count -= 1
+    
+    def _window_wait_time(self, current_time: float) -> float:
+        """Return how long until the window admits another request."""
+        self._cleanup_old_requests(current_time)
+        if self._count >= self.max_requests:
+            if not self._count:
+                # max_requests == 0 admits nothing; recheck once per window
+                return self.per_seconds
+            return self.per_seconds - (current_time - self._ring[self._head])
+        return 0.0
+    
+    def _window_reset_time(self, current_time: float) -> float:
+        """Return how long until the oldest request leaves the window."""
+        self._cleanup_old_requests(current_time)
+        if self._count:
+            return self._ring[self._head] + self.per_seconds - current_time
+        return 0.0
+    
+    def _try_acquire_locked(self, current_time: float) -> bool:
+        """Record a request if the limits allow it. Caller holds the lock."""
+        # Check request-based rate limit (counting this request)
+        if self._requests_in_window(current_time) + 1 > self.max_requests:
+            return False
+            
+        # Check token bucket if enabled
+        if self.use_token_bucket and not self._consume_tokens(self.tokens_per_request):
+            return False
+            
+        # Record the request
+        self._record_request(current_time)
+        return True
+    
+    def _get_wait_time_locked(self, current_time: float) -> float:
+        """Calculate the wait before the next request. Caller holds the lock."""
+        # Calculate wait time based on request rate
+        wait_time = self._window_wait_time(current_time)
+        
+        # Calculate wait time based on token bucket
+        if self.use_token_bucket:
+            self._refill_tokens()
+            if self.tokens < self.tokens_per_request:
+                tokens_needed = self.tokens_per_request - self.tokens
+                wait_time = max(wait_time, tokens_needed / self.token_refill_rate)
+        
+        return max(0.0, wait_time)
     
     def _is_request_allowed(self) -> bool:
         """Check if a new request is allowed based on the rate limit."""
-        current_time = time.time()
-        
-        with self.lock:
-            self._cleanup_old_requests(current_time)
-            
-            # Check request-based rate limit
-            if len(self.requests) >= self.max_requests:
-                return False
-                
-            # Check token bucket if enabled
-            if self.use_token_bucket and not self._consume_tokens(self.tokens_per_request):
-                return False
-                
-            # Record the request
-            self.requests.append(current_time)
-            return True
+        with self._cv:
+            return self._try_acquire_locked(time.monotonic())
     
     def _get_wait_time(self) -> float:
         """Calculate how long to wait before the next request is allowed."""
-        current_time = time.time()
-        
-        with self.lock:
-            self._cleanup_old_requests(current_time)
-            
-            # Calculate wait time based on request rate
-            wait_time = 0.0
-            
-            if self.requests:
-                time_since_oldest = current_time - self.requests[0]
-                if len(self.requests) >= self.max_requests:
-                    wait_time = max(wait_time, self.per_seconds - time_since_oldest)
-            
-            # Calculate wait time based on token bucket
-            if self.use_token_bucket:
-                self._refill_tokens()
-                if self.tokens < self.tokens_per_request:
-                    tokens_needed = self.tokens_per_request - self.tokens
-                    wait_time = max(wait_time, tokens_needed / self.token_refill_rate)
-            
-            return max(0.0, wait_time)
+        with self._cv:
+            return self._get_wait_time_locked(time.monotonic())
     
     def wait(self) -> None:
         """
@@ -141,13 +191,15 @@ class RateLimiter:
         
         This will block the current thread until the rate limit allows another request.
         """
-        while True:
-            if self._is_request_allowed():
-                return
-                
-            wait_time = self._get_wait_time()
-            if wait_time > 0:
-                time.sleep(wait_time)
+        with self._cv:
+            while True:
+                current_time = time.monotonic()
+                if self._try_acquire_locked(current_time):
+                    return
+                    
+                wait_time = self._get_wait_time_locked(current_time)
+                if wait_time > 0:
+                    self._cv.wait(wait_time)
     
     def acquire(self, block: bool = True, timeout: Optional[float] = None) -> bool:
         """
@@ -165,20 +217,27 @@ class RateLimiter:
                 self.wait()
                 return True
             else:
-                end_time = time.time() + timeout
-                while time.time() < end_time:
-                    if self._is_request_allowed():
-                        return True
-                    time.sleep(min(0.1, end_time - time.time()))
-                return False
+                end_time = time.monotonic() + timeout
+                with self._cv:
+                    while True:
+                        current_time = time.monotonic()
+                        if self._try_acquire_locked(current_time):
+                            return True
+                        remaining = end_time - current_time
+                        if remaining <= 0:
+                            return False
+                        wait_time = self._get_wait_time_locked(current_time)
+                        if wait_time > 0:
+                            self._cv.wait(min(wait_time, remaining))
         else:
             return self._is_request_allowed()
     
     def release(self) -> None:
         """Release a request slot (useful for retries or cancellations)."""
-        with self.lock:
-            if self.requests:
-                self.requests.pop()
+        with self._cv:
+            self._release_request()
+            # A slot was freed: wake one blocked caller to take it
+            self._cv.notify()
     
     def get_stats(self) -> Dict[str, Any]:
         """
@@ -187,15 +246,14 @@ class RateLimiter:
         Returns:
             Dict containing rate limiter statistics.
         """
-        current_time = time.time()
+        current_time = time.monotonic()
         
-        with self.lock:
-            self._cleanup_old_requests(current_time)
+        with self._cv:
             stats = {
                 'max_requests': self.max_requests,
-                'requests_in_window': len(self.requests),
+                'requests_in_window': round(self._requests_in_window(current_time)),
                 'window_seconds': self.per_seconds,
-                'time_until_next_window': max(0.0, (self.requests[0] + self.per_seconds - current_time) if self.requests else 0.0),
+                'time_until_next_window': max(0.0, self._window_reset_time(current_time)),
             }
             
             if self.use_token_bucket:
@@ -209,6 +267,83 @@ class RateLimiter:
             
             return stats
 
+class SlidingWindowRateLimiter(RateLimiter):
+    """
+    A rate limiter that approximates the sliding window with two counters.
+    
+    Instead of remembering every request timestamp, this keeps request counts
+    for the current and previous fixed windows and weights the previous count
+    by how much of it still overlaps the sliding window. Memory and work per
+    request are O(1) regardless of max_requests, at the cost of precision: it
+    assumes requests in the previous window were evenly spread, so it may
+    admit or refuse a request or so more than an exact window would.
+    """
+    
+    def _init_window(self) -> None:
+        """Set up the current/previous window counters."""
+        self._window_start = time.monotonic()
+        self._current_count = 0
+        self._previous_count = 0
+    
+    def _rotate_window(self, current_time: float) -> None:
+        """Advance the fixed windows if the current one has ended."""
+        elapsed = current_time - self._window_start
+        if elapsed < self.per_seconds:
+            return
+        if elapsed < 2 * self.per_seconds:
+            self._previous_count = self._current_count
+            self._window_start += self.per_seconds
+        else:
+            # Idle for more than a whole window: nothing carries over
+            self._previous_count = 0
+            self._window_start = current_time
+        self._current_count = 0
+    
+    def _requests_in_window(self, current_time: float) -> float:
+        """Return the weighted request count over the sliding window."""
+        self._rotate_window(current_time)
+        elapsed = current_time - self._window_start
+        overlap = max(0.0, 1.0 - elapsed / self.per_seconds)
+        return self._previous_count * overlap + self._current_count
+    
+    def _record_request(self, current_time: float) -> None:
+        """Record a request made at the given time."""
+        self._current_count += 1
+    
+    def _release_request(self) -> None:
+        """Forget the most recently recorded request."""
+        if self._current_count:
+            self._current_count -= 1
+        elif self._previous_count:
+            self._previous_count -= 1
+    
+    def _window_wait_time(self, current_time: float) -> float:
+        """Return how long until the weighted count leaves room for a request."""
+        # Admitting a request requires count + 1 <= max_requests
+        limit = self.max_requests - 1
+        if self._requests_in_window(current_time) <= limit:
+            return 0.0
+        
+        elapsed = current_time - self._window_start
+        if self._current_count > limit:
+            if not self._current_count:
+                # max_requests == 0 admits nothing; recheck once per window
+                return self.per_seconds
+            # Wait for the next window, then for this window's count to
+            # decay: current * (1 - t / per_seconds) <= limit
+            decay = 1 - max(limit, 0) / self._current_count
+            return (self.per_seconds - elapsed) + self.per_seconds * decay
+        
+        # previous * (1 - t / per_seconds) + current <= limit
+        free = limit - self._current_count
+        return self.per_seconds * (1 - free / self._previous_count) - elapsed
+    
+    def _window_reset_time(self, current_time: float) -> float:
+        """Return how long until the current fixed window ends."""
+        self._rotate_window(current_time)
+        return self.per_seconds - (current_time - self._window_start)
+
+
 # Global rate limiters
 _rate_limiters: Dict[str, RateLimiter] = {}
 
@@ -247,5 +382,5 @@ def get_rate_limiter(
         )
     return _rate_limiters[name]
 
-# Export the RateLimiter class and get_rate_limiter function
-__all__ = ['RateLimiter', 'get_rate_limiter']
+# Export the rate limiter classes and get_rate_limiter function
+__all__ = ['RateLimiter', 'SlidingWindowRateLimiter', 'get_rate_limiter']
@@ -5,6 +5,9 @@ Provides platform-independent runtime information and utilities.
 import os
 import sys
 import platform
+import shlex
+import shutil
+import functools
 import subprocess
 from typing import Optional, Dict, Any, List, Tuple, Union
 
@@ -18,40 +21,92 @@ IS_POSIX = os.name == 'posix'
 PYTHON_VERSION = sys.version_info
 PYTHON_VERSION_STR = f"{PYTHON_VERSION.major}.{PYTHON_VERSION.minor}.{PYTHON_VERSION.micro}"
 
-# Platform info
-PLATFORM = platform.system().lower()
-PLATFORM_RELEASE = platform.release()
-PLATFORM_VERSION = platform.version()
-
 # CPU info
 CPU_COUNT = os.cpu_count() or 1
 
-# Memory info (in bytes)
-MEMORY_TOTAL: Optional[int] = None
-MEMORY_AVAILABLE: Optional[int] = None
-
-try:
-    if IS_WINDOWS:
-        import ctypes
-        kernel32 = ctypes.windll.kernel32
-        MEMORYSTATUS = ctypes.wintypes._MEMORYSTATUSEX()
-        ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(MEMORYSTATUS))
-        MEMORY_TOTAL = getattr(MEMORYSTATUS, 'ullTotalPhys', None)
-        MEMORY_AVAILABLE = getattr(MEMORYSTATUS, 'ullAvailPhys', None)
-    elif IS_LINUX or IS_MAC:
-        import resource
-        MEMORY_TOTAL = os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')  # Total physical memory
-        MEMORY_AVAILABLE = os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_AVPHYS_PAGES')  # Available physical memory
-except Exception:
-    pass  # Ignore errors in memory detection
+def _read_memory() -> Tuple[Optional[int], Optional[int]]:
+    """
+    Query total and available physical memory from the OS.
+    
+    Returns:
+        Tuple of (total, available) in bytes; None for values that can't be determined.
+    """
+    total: Optional[int] = None
+    available: Optional[int] = None
+    try:
+        if IS_WINDOWS:
+            import ctypes
+            
+            class MEMORYSTATUSEX(ctypes.Structure):
+                _fields_ = [
+                    ('dwLength', ctypes.c_ulong),
+                    ('dwMemoryLoad', ctypes.c_ulong),
+                    ('ullTotalPhys', ctypes.c_ulonglong),
+                    ('ullAvailPhys', ctypes.c_ulonglong),
+                    ('ullTotalPageFile', ctypes.c_ulonglong),
+                    ('ullAvailPageFile', ctypes.c_ulonglong),
+                    ('ullTotalVirtual', ctypes.c_ulonglong),
+                    ('ullAvailVirtual', ctypes.c_ulonglong),
+                    ('ullAvailExtendedVirtual', ctypes.c_ulonglong),
+                ]
+            
+            status = MEMORYSTATUSEX()
+            status.dwLength = ctypes.sizeof(status)
+            if ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):
+                total = status.ullTotalPhys
+                available = status.ullAvailPhys
+        elif IS_LINUX or IS_MAC:
+            page_size = os.sysconf('SC_PAGE_SIZE')
+            total = page_size * os.sysconf('SC_PHYS_PAGES')  # Total physical memory
+            available = page_size * os.sysconf('SC_AVPHYS_PAGES')  # Available physical memory
+    except Exception:
+        pass  # Ignore errors in memory detection
+    return total, available
 
-def get_platform_info() -> Dict[str, Any]:
+@functools.lru_cache(maxsize=1)
+def get_memory_total() -> Optional[int]:
     """
-    Get detailed platform information.
+    Get the total physical memory in bytes (queried once, then cached).
     
     Returns:
-        Dict containing platform information.
+        Total physical memory, or None if it can't be determined.
+    """
+    return _read_memory()[0]
+
+def get_memory_available() -> Optional[int]:
     """
+    Get the currently available physical memory in bytes.
+    
+    Returns:
+        Available physical memory, or None if it can't be determined.
+    """
+    return _read_memory()[1]
+
+# Platform info, which used to be computed at import time: platform.*
+# reads system files (and may run a subprocess), so defer it to first use
+_LAZY_PLATFORM = {
+    'PLATFORM': lambda: platform.system().lower(),
+    'PLATFORM_RELEASE': platform.release,
+    'PLATFORM_VERSION': platform.version,
+}
+
+def __getattr__(name: str) -> Any:
+    # MEMORY_TOTAL / MEMORY_AVAILABLE used to be computed at import time;
+    # resolve them on access instead
+    if name == 'MEMORY_TOTAL':
+        return get_memory_total()
+    if name == 'MEMORY_AVAILABLE':
+        return get_memory_available()
+    getter = _LAZY_PLATFORM.get(name)
+    if getter is not None:
+        # These never change, so cache them as real module attributes
+        value = globals()[name] = getter()
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+@functools.lru_cache(maxsize=1)
+def _static_platform_info() -> Dict[str, Any]:
+    """Collect the platform information that doesn't change while running."""
     return {
         'system': platform.system(),
         'node': platform.node(),
@@ -64,10 +119,23 @@ def get_platform_info() -> Dict[str, Any]:
         'python_compiler': platform.python_compiler(),
         'architecture': platform.architecture(),
         'cpu_count': CPU_COUNT,
-        'memory_total': MEMORY_TOTAL,
-        'memory_available': MEMORY_AVAILABLE,
+        'memory_total': get_memory_total(),
     }
 
+def get_platform_info() -> Dict[str, Any]:
+    """
+    Get detailed platform information.
+    
+    Static fields are collected once and cached; memory_available is
+    queried on every call.
+    
+    Returns:
+        Dict containing platform information.
+    """
+    info = dict(_static_platform_info())
+    info['memory_available'] = get_memory_available()
+    return info
+
 def is_program_installed(program: str) -> bool:
     """
     Check if a program is installed and available in the system PATH.
@@ -78,21 +146,9 @@ def is_program_installed(program: str) -> bool:
     Returns:
         bool: True if the program is installed, False otherwise.
     """
-    try:
-        if IS_WINDOWS:
-            cmd = ['where', program]
-        else:
-            cmd = ['which', program]
-            
-        result = subprocess.run(
-            cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True
-        )
-        return result.returncode == 0
-    except Exception:
-        return False
+    # shutil.which searches PATH (honouring PATHEXT on Windows) without
+    # spawning a `which`/`where` subprocess
+    return shutil.which(program) is not None
 
 def run_command(
     command: Union[str, List[str]],
@@ -107,9 +163,11 @@ def run_command(
     Run a shell command and return the result.
     
     Args:
-        command: The command to run as a string or list of strings.
+        command: The command to run as a string or list of strings. Without
+            a shell, a string is split into arguments with shlex on POSIX
+            (Windows parses the command line itself).
         cwd: Working directory for the command.
-        env: Environment variables to use.
+        env: Environment variables to use (None inherits the current ones).
         shell: Whether to use the shell to execute the command.
         capture_output: Whether to capture stdout and stderr.
         check: If True, raises CalledProcessError if the command fails.
@@ -118,13 +176,14 @@ def run_command(
     Returns:
         subprocess.CompletedProcess: The result of the command execution.
     """
-    if isinstance(command, str) and not shell:
-        command = [command]
+    if isinstance(command, str) and not shell and not IS_WINDOWS:
+        command = shlex.split(command)
     
     return subprocess.run(
         command,
         cwd=cwd,
-        env=env or os.environ,
+        # None lets the child inherit the environment without a copy
+        env=env or None,
         shell=shell,
         capture_output=capture_output,
         text=True,
@@ -157,6 +216,8 @@ BYTE_UNITS = {
     'TB': 1024 ** 4,
 }
 
+_BYTE_UNIT_NAMES = tuple(BYTE_UNITS)
+
 def format_bytes(size_bytes: int) -> str:
     """
     Format a size in bytes to a human-readable string.
@@ -170,12 +231,10 @@ def format_bytes(size_bytes: int) -> str:
     if size_bytes < 1024:
         return f"{size_bytes} B"
     
-    for unit in ['KB', 'MB', 'GB', 'TB']:
-        size_bytes /= 1024
-        if size_bytes < 1024 or unit == 'TB':
-            return f"{size_bytes:.2f} {unit}"
-    
-    return f"{size_bytes} B"
+    # Each unit is 2**10 times the previous one, so the unit index is
+    # (number of bits - 1) // 10, capped at the largest unit
+    index = min((int(size_bytes).bit_length() - 1) // 10, len(_BYTE_UNIT_NAMES) - 1)
+    return f"{size_bytes / (1 << (index * 10)):.2f} {_BYTE_UNIT_NAMES[index]}"
 
 # Export commonly used functions and variables
 __all__ = [
@@ -191,6 +250,8 @@ __all__ = [
     'CPU_COUNT',
     'MEMORY_TOTAL',
     'MEMORY_AVAILABLE',
+    'get_memory_total',
+    'get_memory_available',
     'get_platform_info',
     'is_program_installed',
     'run_command',
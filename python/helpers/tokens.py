@@ -7,28 +7,165 @@ This module provides functionality for working with tokens, including:
 - Token window management
 - Token-based rate limiting
 """
-from typing import Dict, List, Optional, Tuple, Union, Any, Callable, TypeVar, Generic, cast
+from typing import Deque, Dict, List, Mapping, Optional, Tuple, Union, Any, Callable, TypeVar, Generic, cast
+from array import array
+from collections import deque
+from types import MappingProxyType
 import re
 import tiktoken
+from functools import lru_cache
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
+import asyncio
 import json
+import threading
 import time
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Type variable for generic functions
 T = TypeVar('T')
 
 # Default tokenizer to use (can be overridden)
 DEFAULT_ENCODING = "cl100k_base"
 
+# Context sizes (in tokens) of known models, keyed by lowercased name
+_MODEL_CONTEXT_SIZES: Mapping[str, int] = MappingProxyType({
+    "gpt-4": 8192,
+    "gpt-4-32k": 32768,
+    "gpt-3.5-turbo": 4096,
+    "gpt-3.5-turbo-16k": 16384,
+    "text-davinci-003": 4097,
+    "text-davinci-002": 4097,
+    "code-davinci-002": 8001,
+})
+
+# Average characters per token by kind of content, for estimate_tokens
+_CHARS_PER_TOKEN: Mapping[str, float] = MappingProxyType({
+    "english": 4,
+    "code": 3,
+    "json": 3,
+    "mixed": 3.5,
+})
+
+# count_tokens memoizes results for texts shorter than this; longer texts
+# would make the cache keys themselves costly to keep around
+_COUNT_CACHE_MAX_LEN = 8192
+_COUNT_CACHE_SIZE = 4096
+
+# truncate_to_token_limit first encodes only this many characters per
+# allowed token, doubling the slice until it holds enough tokens
+_TRUNCATE_CHARS_PER_TOKEN = 8
+# A space or tab right after a non-space character. No pre-tokenizer
+# pattern of the tiktoken encodings runs from a non-space character into
+# a following space or tab, so this is always a pre-token boundary: text
+# cut there encodes to exactly the tokens the full text has on that side
+_WORD_GAP_RE = re.compile(r'(?<=\S)[ \t]')
+
+@lru_cache(maxsize=32)
+def _get_encoding(model: str) -> tiktoken.Encoding:
+    """Get the tiktoken encoding for a model, cached per model name.
+    
+    Unknown models (and DEFAULT_ENCODING itself) fall back to the
+    default encoding.
+    """
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding(DEFAULT_ENCODING)
+
+
+# JSON strings (matched so their contents are skipped), floats in
+# exponent form, and the non-finite constants json.dumps writes
+_JSON_FLOAT_RE = re.compile(r'"(?:[^"\\]|\\.)*"|(-?)(\d)(?:\.(\d+))?e([+-])(\d+)|-?Infinity|NaN')
+
+
+def _orjson_float(match: "re.Match[str]") -> str:
+    """Rewrite one _JSON_FLOAT_RE match the way orjson writes it."""
+    text = match.group(0)
+    if text[0] == '"':
+        return text
+    digit = match.group(2)
+    if digit is None:
+        # orjson writes NaN and infinities as null
+        return 'null'
+    sign, fraction, exp_sign, exponent = match.group(1, 3, 4, 5)
+    fraction = fraction or ''
+    exponent = int(exponent)
+    if exp_sign == '-' and exponent == 5:
+        # orjson only switches to exponent form below 1e-5
+        return f"{sign}0.0000{digit}{fraction}"
+    mantissa = f"{digit}.{fraction}" if fraction else digit
+    return f"{sign}{mantissa}e{'-' if exp_sign == '-' else ''}{exponent}"
+
+
+def _json_dumps(obj: Any) -> str:
+    """Serialize obj as compact JSON with sorted keys using the stdlib encoder.
+    
+    Floats and non-finite values are written as orjson writes them, so
+    both paths produce the same text, and the same tokens, for plain JSON
+    data.
+    """
+    try:
+        text = json.dumps(obj, ensure_ascii=False, separators=(',', ':'), sort_keys=True)
+    except TypeError:
+        # Keys of mixed types can't be sorted
+        text = json.dumps(obj, ensure_ascii=False, separators=(',', ':'))
+    return _JSON_FLOAT_RE.sub(_orjson_float, text)
+
+
+if orjson is not None:
+    # Sorted keys give objects of the same shape the same serialized
+    # prefix, so repeated shapes encode to identical leading tokens
+    _ORJSON_OPTIONS = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS
+    
+    def _dumps(obj: Any) -> str:
+        """Serialize obj as compact JSON with sorted keys."""
+        try:
+            return orjson.dumps(obj, option=_ORJSON_OPTIONS).decode('utf-8')
+        except TypeError:
+            # e.g. integers beyond 64 bits, which only json handles
+            return _json_dumps(obj)
+    
+    # Integer literals this long may be beyond 64 bits, which orjson would
+    # read back as a lossy float; only json reads those exactly
+    _LONG_DIGITS = re.compile(r'\d{19}')
+    
+    def _loads(json_str: str) -> Any:
+        """Parse JSON, using json for documents orjson can't read exactly."""
+        if _LONG_DIGITS.search(json_str):
+            return json.loads(json_str)
+        return orjson.loads(json_str)
+else:
+    _dumps = _json_dumps
+    _loads = json.loads
+
+
+# Encoding used by the JSON helpers, bound on first use rather than at
+# import (loading it reads, and may first download, the BPE ranks)
+_DEFAULT_ENC: Optional[tiktoken.Encoding] = None
+
+
+def _default_encoding() -> tiktoken.Encoding:
+    """Bind and return the DEFAULT_ENCODING encoding."""
+    global _DEFAULT_ENC
+    _DEFAULT_ENC = tiktoken.get_encoding(DEFAULT_ENCODING)
+    return _DEFAULT_ENC
+
+
+# eq=False keeps identity equality and hashing: the stats are mutable
+# counters, and a generated __eq__ would set __hash__ to None
+@dataclass(slots=True, eq=False)
 class TokenUsageStats:
     """Tracks token usage statistics."""
     
-    def __init__(self):
-        self.prompt_tokens: int = 0
-        self.completion_tokens: int = 0
-        self.total_tokens: int = 0
-        self.requests: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    total_tokens: int = 0
+    requests: int = 0
     
     def update(self, prompt_tokens: int, completion_tokens: int) -> None:
         """Update the token counts."""
@@ -39,6 +176,7 @@ class TokenUsageStats:
     
     def to_dict(self) -> Dict[str, int]:
         """Convert the stats to a dictionary."""
+        # Built directly: asdict() would recurse and deep-copy for no gain
         return {
             'prompt_tokens': self.prompt_tokens,
             'completion_tokens': self.completion_tokens,
@@ -49,46 +187,90 @@ class TokenUsageStats:
     @classmethod
     def from_dict(cls, data: Dict[str, int]) -> 'TokenUsageStats':
         """Create a TokenUsageStats instance from a dictionary."""
-        stats = cls()
-        stats.prompt_tokens = data.get('prompt_tokens', 0)
-        stats.completion_tokens = data.get('completion_tokens', 0)
-        stats.total_tokens = data.get('total_tokens', 0)
-        stats.requests = data.get('requests', 0)
-        return stats
+        return cls(
+            prompt_tokens=data.get('prompt_tokens', 0),
+            completion_tokens=data.get('completion_tokens', 0),
+            total_tokens=data.get('total_tokens', 0),
+            requests=data.get('requests', 0)
+        )
 
 
-def count_tokens(text: str, model: str = "gpt-4") -> int:
+def _encode_len(encoding: tiktoken.Encoding, text: str, trusted: bool) -> int:
+    """Count the tokens text encodes to, skipping the special-token scan if trusted."""
+    if trusted:
+        return len(encoding.encode_ordinary(text))
+    return len(encoding.encode(text))
+
+
+@lru_cache(maxsize=_COUNT_CACHE_SIZE)
+def _count_tokens_cached(text: str, model: str, trusted: bool) -> int:
+    """Count tokens, memoized on (text, model, trusted)."""
+    return _encode_len(_get_encoding(model), text, trusted)
+
+
+def count_tokens(text: str, model: str = "gpt-4", trusted: bool = False) -> int:
     """Count the number of tokens in a text string.
     
+    Results for short texts are cached, so repeated messages (e.g. the
+    same system prompt) are only encoded once.
+    
     Args:
         text: The text to count tokens for
         model: The model to use for tokenization
+        trusted: If True, skip the check for special tokens such as
+            <|endoftext|> (which otherwise raises ValueError) and count
+            any as plain text; saves a scan of the text
         
     Returns:
         Number of tokens
     """
-    try:
-        encoding = tiktoken.encoding_for_model(model)
-    except KeyError:
-        # Fall back to default encoding if model not found
-        encoding = tiktoken.get_encoding(DEFAULT_ENCODING)
-    
-    return len(encoding.encode(text))
+    if len(text) < _COUNT_CACHE_MAX_LEN:
+        return _count_tokens_cached(text, model, trusted)
+    return _encode_len(_get_encoding(model), text, trusted)
 
 
-def estimate_tokens(text: str) -> int:
+def estimate_tokens(text: str, kind: str = "english") -> int:
     """Estimate the number of tokens in a text string.
     
     This is a faster but less accurate method than count_tokens.
     
     Args:
         text: The text to estimate tokens for
+        kind: The kind of content ("english", "code", "json" or "mixed");
+            unknown kinds are estimated as English
         
     Returns:
         Estimated number of tokens
     """
-    # Rough estimate: 1 token ~= 4 chars in English
-    return (len(text) + 3) // 4
+    # Rough estimate: 1 token ~= 4 chars in English, fewer for code/JSON
+    ratio = _CHARS_PER_TOKEN.get(kind, 4)
+    return int(-(-len(text) // ratio))
+
+
+def estimate_tokens_batch(texts: List[str], kind: str = "english") -> List[int]:
+    """Estimate the number of tokens in each of several text strings.
+    
+    Same heuristic as estimate_tokens, for pre-screening many candidates
+    before paying for real tokenization.
+    
+    Args:
+        texts: The texts to estimate tokens for
+        kind: The kind of content, as for estimate_tokens
+        
+    Returns:
+        Estimated number of tokens for each text, in order
+    """
+    ratio = _CHARS_PER_TOKEN.get(kind, 4)
+    return [int(-(-length // ratio)) for length in map(len, texts)]
+
+
+def _last_word_gap(text: str, end: int) -> int:
+    """Return the index of the last word gap before end in text, or -1."""
+    while end > 0:
+        end = max(text.rfind(' ', 0, end), text.rfind('\t', 0, end))
+        if end > 0 and not text[end - 1].isspace():
+            return end
+    return -1
 
 
 def truncate_to_token_limit(
@@ -108,10 +290,30 @@ def truncate_to_token_limit(
     Returns:
         Truncated text
     """
-    try:
-        encoding = tiktoken.encoding_for_model(model)
-    except KeyError:
-        encoding = tiktoken.get_encoding(DEFAULT_ENCODING)
+    encoding = _get_encoding(model)
+    
+    # Encode a bounded slice from the end being kept instead of the whole
+    # text, which may be far longer than the limit. The slice is cut at a
+    # word gap so its tokens match the full text's; without one, grow it
+    if max_tokens > 0:
+        size = max_tokens * _TRUNCATE_CHARS_PER_TOKEN
+        while size < len(text):
+            part = None
+            if from_end:
+                gap = _WORD_GAP_RE.search(text, len(text) - size)
+                if gap is not None:
+                    part = text[gap.start():]
+            else:
+                end = _last_word_gap(text, size)
+                if end > 0:
+                    part = text[:end]
+            if part is not None:
+                tokens = encoding.encode(part)
+                if len(tokens) > max_tokens:
+                    if from_end:
+                        return encoding.decode(tokens[-max_tokens:])
+                    return encoding.decode(tokens[:max_tokens])
+            size *= 2
     
     tokens = encoding.encode(text)
     
@@ -126,9 +328,54 @@ def truncate_to_token_limit(
     return encoding.decode(truncated)
 
 
+async def count_tokens_async(text: str, model: str = "gpt-4", trusted: bool = False) -> int:
+    """Count tokens in a worker thread without blocking the event loop.
+    
+    tiktoken releases the GIL while encoding, so other tasks keep running.
+    For many texts, prefer one batched call over many of these.
+    
+    Args:
+        text: The text to count tokens for
+        model: The model to use for tokenization
+        trusted: See count_tokens
+        
+    Returns:
+        Number of tokens
+    """
+    return await asyncio.to_thread(count_tokens, text, model, trusted)
+
+
+async def truncate_to_token_limit_async(
+    text: str, 
+    max_tokens: int, 
+    model: str = "gpt-4",
+    from_end: bool = False
+) -> str:
+    """Truncate text to a token limit in a worker thread.
+    
+    See truncate_to_token_limit; this runs it via asyncio.to_thread so
+    the event loop isn't blocked.
+    
+    Args:
+        text: The text to truncate
+        max_tokens: Maximum number of tokens allowed
+        model: The model to use for tokenization
+        from_end: If True, truncate from the end instead of the beginning
+        
+    Returns:
+        Truncated text
+    """
+    return await asyncio.to_thread(truncate_to_token_limit, text, max_tokens, model, from_end)
+
+
 class TokenWindow:
     """Manages a sliding window of tokens with configurable limits."""
     
+    __slots__ = (
+        'max_tokens', 'max_items', 'model', 'items', 'total_tokens',
+        '_encoding', '_content_chars', '_contents',
+    )
+    
     def __init__(
         self, 
         max_tokens: int,
@@ -138,27 +385,57 @@ class TokenWindow:
         """Initialize the token window.
         
         Args:
-            max_tokens: Maximum number of tokens allowed in the window
+            max_tokens: Maximum number of tokens allowed in the window;
+                clamped to the model's context size if the model is known
             max_items: Optional maximum number of items in the window
             model: The model to use for token counting
         """
+        # A window larger than the model's context could never be sent
+        context_size = _MODEL_CONTEXT_SIZES.get(model.lower() if model else "")
+        if context_size is not None:
+            max_tokens = min(max_tokens, context_size)
         self.max_tokens = max_tokens
         self.max_items = max_items
         self.model = model
-        self.items: List[Tuple[str, int]] = []  # (content, token_count)
+        self._encoding = _get_encoding(model)
+        # (content, token_count), oldest first; popped from the left in O(1)
+        self.items: Deque[Tuple[str, int]] = deque()
         self.total_tokens = 0
+        # Running sum of len(content) over items, and the joined contents
+        # (None until get_contents() is called after a change)
+        self._content_chars = 0
+        self._contents: Optional[str] = None
     
-    def add(self, content: str) -> Tuple[bool, int]:
+    def add(self, content: str, evict: bool = False) -> Tuple[bool, int]:
         """Add content to the window.
         
         Args:
             content: The content to add
+            evict: If True, remove the oldest items until the content fits
+                instead of rejecting it
             
         Returns:
             Tuple of (success, tokens_added)
         """
         token_count = count_tokens(content, self.model)
         
+        if evict:
+            # Content that wouldn't fit even in an empty window is rejected
+            # without evicting anything
+            if token_count > self.max_tokens or self.max_items == 0:
+                return False, 0
+            
+            # Evicted items' token counts were stored on insert, so nothing
+            # is re-encoded here
+            items = self.items
+            while items and (
+                self.total_tokens + token_count > self.max_tokens
+                or (self.max_items is not None and len(items) >= self.max_items)
+            ):
+                old_content, old_count = items.popleft()
+                self.total_tokens -= old_count
+                self._content_chars -= len(old_content)
+        
         # Check if we can add this without exceeding limits
         if self.max_items is not None and len(self.items) >= self.max_items:
             return False, 0
@@ -168,8 +445,43 @@ class TokenWindow:
         
         self.items.append((content, token_count))
         self.total_tokens += token_count
+        self._content_chars += len(content)
+        self._contents = None
         return True, token_count
     
+    def add_many(self, contents: List[str]) -> Tuple[int, int]:
+        """Add several items to the window, tokenizing them in one batch.
+        
+        Items are admitted in order, stopping at the first one that would
+        exceed the window's limits.
+        
+        Args:
+            contents: The contents to add
+            
+        Returns:
+            Tuple of (items_added, tokens_added)
+        """
+        token_lists = self._encoding.encode_batch(contents)
+        
+        added = 0
+        tokens_added = 0
+        for content, tokens in zip(contents, token_lists):
+            token_count = len(tokens)
+            if self.max_items is not None and len(self.items) >= self.max_items:
+                break
+            if self.total_tokens + token_count > self.max_tokens:
+                break
+            
+            self.items.append((content, token_count))
+            self.total_tokens += token_count
+            self._content_chars += len(content)
+            added += 1
+            tokens_added += token_count
+        
+        if added:
+            self._contents = None
+        return added, tokens_added
+    
     def pop(self) -> Optional[str]:
         """Remove and return the oldest item from the window.
         
@@ -179,18 +491,33 @@ class TokenWindow:
         if not self.items:
             return None
             
-        content, token_count = self.items.pop(0)
+        content, token_count = self.items.popleft()
         self.total_tokens -= token_count
+        self._content_chars -= len(content)
+        self._contents = None
         return content
     
     def clear(self) -> None:
         """Clear all items from the window."""
-        self.items = []
+        self.items.clear()
         self.total_tokens = 0
+        self._content_chars = 0
+        self._contents = None
     
     def get_contents(self) -> str:
-        """Get all window contents as a single string."""
-        return "\n".join(item[0] for item in self.items)
+        """Get all window contents as a single string.
+        
+        The joined string is cached until the window next changes.
+        """
+        contents = self._contents
+        if contents is None:
+            contents = self._contents = "\n".join(item[0] for item in self.items)
+        return contents
+    
+    def get_contents_length(self) -> int:
+        """Get the length of get_contents() without joining the items."""
+        # Items are joined with one newline between each pair
+        return self._content_chars + max(len(self.items) - 1, 0)
     
     def is_full(self) -> bool:
         """Check if the window is full."""
@@ -202,6 +529,8 @@ class TokenWindow:
 class TokenBucket:
     """Implements the token bucket algorithm for rate limiting."""
     
+    __slots__ = ('tokens_per_interval', 'interval', 'tokens', 'last_update', 'lock')
+    
     def __init__(self, tokens_per_interval: float, interval: float = 60.0):
         """Initialize the token bucket.
         
@@ -212,14 +541,20 @@ class TokenBucket:
         self.tokens_per_interval = tokens_per_interval
         self.interval = interval
         self.tokens = tokens_per_interval
-        self.last_update = time.time()
-        self.lock = False  # Simple lock to prevent race conditions
+        # Monotonic, so wall-clock adjustments can't drain or overfill the bucket
+        self.last_update = time.monotonic()
+        self.lock = threading.Lock()
     
     def _update_tokens(self) -> None:
         """Update the token count based on elapsed time."""
-        now = time.time()
-        time_passed = now - self.last_update
+        now = time.monotonic()
+        
+        if self.tokens >= self.tokens_per_interval:
+            # Already full: nothing to add
+            self.last_update = now
+            return
         
+        time_passed = now - self.last_update
         if time_passed > 0:
             # Add tokens based on time passed
             self.tokens += (time_passed / self.interval) * self.tokens_per_interval
@@ -235,26 +570,19 @@ class TokenBucket:
         Returns:
             True if tokens were consumed, False if not enough tokens
         """
-        # Simple locking to prevent race conditions
-        while self.lock:
-            time.sleep(0.001)
-        
-        self.lock = True
-        
-        try:
+        with self.lock:
             self._update_tokens()
             
             if tokens <= self.tokens:
                 self.tokens -= tokens
                 return True
             return False
-        finally:
-            self.lock = False
     
     def get_tokens(self) -> float:
         """Get the current number of tokens in the bucket."""
-        self._update_tokens()
-        return self.tokens
+        with self.lock:
+            self._update_tokens()
+            return self.tokens
 
 
 def tokenize_json(obj: Any) -> List[int]:
@@ -266,9 +594,44 @@ def tokenize_json(obj: Any) -> List[int]:
     Returns:
         List of token IDs
     """
-    # Convert to JSON string and count tokens
-    json_str = json.dumps(obj, ensure_ascii=False)
-    return list(tiktoken.get_encoding(DEFAULT_ENCODING).encode(json_str))
+    # Convert to compact JSON (for plain JSON data, the same text with or
+    # without orjson) and encode
+    json_str = _dumps(obj)
+    # Serialized JSON is plain data: encode any special-token text in it as
+    # ordinary text, which also skips encode()'s scan for special tokens
+    return (_DEFAULT_ENC or _default_encoding()).encode_ordinary(json_str)
+
+
+def tokenize_json_compact(obj: Any) -> array:
+    """Tokenize a JSON-serializable object into a compact token array.
+    
+    Same tokens as tokenize_json, stored as unsigned 32-bit ints (4 bytes
+    per token rather than a Python int object each), for long sequences
+    that are kept around or only iterated.
+    
+    Args:
+        obj: The object to tokenize
+        
+    Returns:
+        Array of token IDs (typecode 'I')
+    """
+    return array('I', tokenize_json(obj))
+
+
+def tokenize_json_batch(objs: List[Any]) -> List[List[int]]:
+    """Tokenize several JSON-serializable objects in one batch.
+    
+    Equivalent to calling tokenize_json on each object, but the encoding
+    runs as a single batch call.
+    
+    Args:
+        objs: The objects to tokenize
+        
+    Returns:
+        List of token ID lists, one per object
+    """
+    json_strs = [_dumps(obj) for obj in objs]
+    return (_DEFAULT_ENC or _default_encoding()).encode_ordinary_batch(json_strs)
 
 
 def detokenize_json(token_ids: List[int]) -> Any:
@@ -280,28 +643,19 @@ def detokenize_json(token_ids: List[int]) -> Any:
     Returns:
         The decoded Python object
     """
-    json_str = tiktoken.get_encoding(DEFAULT_ENCODING).decode(token_ids)
-    return json.loads(json_str)
+    json_str = (_DEFAULT_ENC or _default_encoding()).decode(token_ids)
+    return _loads(json_str)
 
 
 def get_model_context_size(model: str) -> int:
     """Get the context size (in tokens) for a given model.
     
+    Model names are matched case-insensitively.
+    
     Args:
         model: The model name
         
     Returns:
         Context size in tokens
     """
-    # Default to a reasonable value if model not found
-    model_context_sizes = {
-        "gpt-4": 8192,
-        "gpt-4-32k": 32768,
-        "gpt-3.5-turbo": 4096,
-        "gpt-3.5-turbo-16k": 16384,
-        "text-davinci-003": 4097,
-        "text-davinci-002": 4097,
-        "code-davinci-002": 8001,
-    }
-    
-    return model_context_sizes.get(model, 4096)  # Default to 4K if unknown
+    return _MODEL_CONTEXT_SIZES.get(model.lower() if model else "", 4096)  # Default to 4K if unknown
@@ -0,0 +1,31 @@
+"""
+Tests for loading .env files.
+"""
+import os
+
+from python.helpers.dotenv import load_dotenv
+
+
+def test_repeated_keys(tmp_path, monkeypatch):
+    monkeypatch.delenv("AGENT2000_TEST_DUP", raising=False)
+    path = tmp_path / ".env"
+    path.write_text("AGENT2000_TEST_DUP=first\nAGENT2000_TEST_DUP=second\n")
+
+    assert load_dotenv(str(path))
+    assert os.environ["AGENT2000_TEST_DUP"] == "first"
+
+    assert load_dotenv(str(path), override=True)
+    assert os.environ["AGENT2000_TEST_DUP"] == "second"
+
+
+def test_rewrite_within_one_mtime_tick(tmp_path, monkeypatch):
+    monkeypatch.delenv("AGENT2000_TEST_VALUE", raising=False)
+    path = tmp_path / ".env"
+    path.write_text("AGENT2000_TEST_VALUE=one\n")
+    mtime = os.stat(path).st_mtime_ns
+    assert load_dotenv(str(path))
+
+    path.write_text("AGENT2000_TEST_VALUE='three'\n")
+    os.utime(path, ns=(mtime, mtime))
+    assert load_dotenv(str(path), override=True)
+    assert os.environ["AGENT2000_TEST_VALUE"] == "three"
@@ -0,0 +1,28 @@
+"""
+Tests for the custom error classes.
+"""
+import pickle
+
+from python.helpers.errors import BaseError, NotFoundError, RateLimitError, ValidationError
+
+
+def test_pickle_round_trip():
+    cause = ValueError("bad value")
+    errors = [
+        BaseError("boom", code="custom", details={"a": 1}, cause=cause),
+        ValidationError("invalid", details={"field": "name"}),
+        NotFoundError("user"),
+        RateLimitError(retry_after=1.5, limit=10),
+    ]
+    for error in errors:
+        error.extra = "kept"
+        restored = pickle.loads(pickle.dumps(error))
+        assert type(restored) is type(error)
+        assert restored.args == error.args
+        assert str(restored) == str(error)
+        assert restored.to_dict() == error.to_dict()
+        assert restored.extra == "kept"
+
+    restored = pickle.loads(pickle.dumps(errors[0]))
+    assert isinstance(restored.cause, ValueError)
+    assert restored.cause.args == ("bad value",)
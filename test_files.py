@@ -0,0 +1,37 @@
+"""
+Tests for the file helpers.
+"""
+from python.helpers import files
+from python.helpers.files import get_file_hash, read_file_chunks
+
+
+def test_read_file_chunks_yields_full_bytes_chunks(tmp_path):
+    path = tmp_path / "data.bin"
+    path.write_bytes(bytes(range(256)) * 40)
+
+    chunks = list(read_file_chunks(path, chunk_size=1000))
+    assert all(type(chunk) is bytes for chunk in chunks)
+    assert [len(chunk) for chunk in chunks] == [1000] * 10 + [240]
+    assert b"".join(chunks) == path.read_bytes()
+
+
+def test_read_file_chunks_zero_copy(tmp_path, monkeypatch):
+    monkeypatch.setattr(files, "_MMAP_THRESHOLD", 1)
+    path = tmp_path / "data.bin"
+    path.write_bytes(b"abc" * 1000)
+
+    # bytes unless zero_copy is requested, even for mapped sizes
+    assert type(next(read_file_chunks(path))) is bytes
+    chunks = list(read_file_chunks(path, chunk_size=1024, zero_copy=True))
+    assert all(isinstance(chunk, memoryview) for chunk in chunks)
+    assert b"".join(chunks) == path.read_bytes()
+    del chunks
+
+
+def test_get_file_hash(tmp_path):
+    path = tmp_path / "data.txt"
+    path.write_bytes(b"hello")
+    assert get_file_hash(path) == (
+        "2cf24dba5fb0a30e26e83b2ac5b9e29e1b161e5c1fa7425e73043362938b9824"
+    )
+    assert get_file_hash(path, "MD5") == "5d41402abc4b2a76b9719d911017c592"
@@ -0,0 +1,188 @@
+"""
+Tests for history persistence: the JSON Lines log, its index and pruning.
+"""
+import gc
+import json
+import os
+import weakref
+
+import pytest
+
+from python.helpers import history
+from python.helpers.history import HistoryConfig, HistoryEntry, HistoryManager
+
+
+def _manager(path, **kwargs):
+    config = HistoryConfig(storage_path=str(path), auto_prune=False, **kwargs)
+    return HistoryManager(config)
+
+
+def test_persist_and_reload(tmp_path):
+    manager = _manager(tmp_path)
+    ids = [manager.add_entry("message", {"n": n}, {"role": "user"}) for n in range(5)]
+    manager.close()
+
+    reloaded = _manager(tmp_path)
+    assert reloaded.load_from_disk() == 5
+    assert [e.id for e in reloaded.get_entries()] == ids
+    assert reloaded.get_entry(ids[2]).data == {"n": 2}
+    assert reloaded.load_entry(ids[4]).metadata == {"role": "user"}
+
+
+def test_reload_skips_entries_already_in_memory(tmp_path):
+    manager = _manager(tmp_path)
+    manager.add_entry("message", {"n": 0})
+    assert manager.load_from_disk() == 0
+    assert len(manager.get_entries()) == 1
+    manager.close()
+
+
+def test_prune_keeps_entries_from_other_sessions(tmp_path):
+    # A manager that never loaded the log
+    manager = _manager(tmp_path, max_entries=3)
+    ids = [manager.add_entry("message", {"n": n}) for n in range(4)]
+    manager.flush()
+
+    other = _manager(tmp_path)
+    ids += [other.add_entry("message", {"n": n}) for n in range(4, 6)]
+    other.close()
+
+    assert manager.prune_entries() == 1
+    manager.close()
+
+    reloaded = _manager(tmp_path)
+    assert reloaded.load_from_disk() == 3
+    assert [e.id for e in reloaded.get_entries()] == ids[-3:]
+
+
+def test_legacy_files_are_migrated_once(tmp_path):
+    legacy = [
+        {"id": f"legacy{n}", "timestamp": f"2020-01-01T00:00:0{n}.000000",
+         "type": "message", "data": {"n": n}, "metadata": {}}
+        for n in range(3)
+    ]
+    for entry in legacy:
+        with open(tmp_path / f"{entry['id']}.json", "w") as f:
+            json.dump(entry, f)
+
+    manager = _manager(tmp_path, max_entries=2)
+    assert manager.load_from_disk() == 3
+    assert not list(tmp_path.glob("*.json"))
+    assert manager.prune_entries() == 1
+    manager.close()
+
+    reloaded = _manager(tmp_path)
+    assert reloaded.load_from_disk() == 2
+    assert [e.id for e in reloaded.get_entries()] == ["legacy1", "legacy2"]
+
+
+def test_stale_index_is_rebuilt(tmp_path):
+    manager = _manager(tmp_path)
+    ids = [manager.add_entry("message", {"n": n}) for n in range(3)]
+    manager.close()
+    os.remove(tmp_path / "history.idx")
+
+    reloaded = _manager(tmp_path)
+    assert reloaded.load_from_disk() == 3
+    assert reloaded.load_entry(ids[1]).data == {"n": 1}
+
+
+def test_big_integers_round_trip(tmp_path):
+    big = 2 ** 70 + 1
+    manager = _manager(tmp_path)
+    entry_id = manager.add_entry("message", {"n": big, "small": 2 ** 40})
+    manager.close()
+
+    reloaded = _manager(tmp_path)
+    reloaded.load_from_disk()
+    assert reloaded.get_entry(entry_id).data == {"n": big, "small": 2 ** 40}
+    assert reloaded.load_entry(entry_id).data["n"] == big
+
+
+def test_writer_batches_and_flushes(tmp_path):
+    manager = _manager(tmp_path)
+    ids = [manager.add_entry("message", {"n": n}) for n in range(100)]
+    manager.flush()
+    assert manager._writer.is_alive()
+    assert manager.load_entry(ids[-1]).data == {"n": 99}
+
+    manager.close()
+    assert manager._writer is None
+    with open(tmp_path / "history.jsonl", "rb") as f:
+        assert sum(1 for _ in f) == 100
+
+
+def test_full_queue_writes_synchronously(tmp_path, monkeypatch):
+    manager = _manager(tmp_path)
+    # Keep the background writer from draining the queue
+    monkeypatch.setattr(manager, "_start_writer", lambda: None)
+    manager._write_queue.maxsize = 1
+    ids = [manager.add_entry("message", {"n": n}) for n in range(3)]
+
+    # The first entry is still queued; the others were written directly
+    assert manager.load_entry(ids[0]) is None
+    assert manager.load_entry(ids[2]).data == {"n": 2}
+
+
+def test_entry_is_a_read_only_mapping():
+    entry = HistoryEntry("abc", "2024-01-01T00:00:00.000000", "message", {"n": 1})
+    assert dict(entry) == {
+        "id": "abc", "timestamp": "2024-01-01T00:00:00.000000",
+        "type": "message", "data": {"n": 1}, "metadata": {},
+    }
+    assert list(entry) == ["id", "timestamp", "type", "data", "metadata"]
+    assert len(entry) == 5
+    assert entry["type"] == "message" and entry.get("missing") is None
+    assert "data" in entry and "missing" not in entry
+    assert json.loads(json.dumps(entry.to_dict())) == dict(entry)
+
+
+def test_reloaded_metadata_is_pooled_and_read_only(tmp_path):
+    manager = _manager(tmp_path)
+    first = manager.add_entry("message", {"n": 0}, {"role": "user"})
+    second = manager.add_entry("message", {"n": 1}, {"role": "user"})
+    bare = manager.add_entry("message", {"n": 2})
+    manager.close()
+
+    reloaded = _manager(tmp_path)
+    reloaded.load_from_disk()
+    for source in (manager.get_entry, reloaded.get_entry, reloaded.load_entry):
+        entry = source(first)
+        assert entry.metadata == {"role": "user"}
+        with pytest.raises(TypeError):
+            entry.metadata["role"] = "assistant"
+        with pytest.raises(TypeError):
+            source(bare).metadata["x"] = 1
+    assert reloaded.get_entry(first).metadata is reloaded.get_entry(second).metadata
+
+
+def test_context_manager_closes_writer(tmp_path):
+    with _manager(tmp_path) as manager:
+        entry_id = manager.add_entry("message", {"n": 0})
+        writer = manager._writer
+        assert writer.is_alive()
+    assert manager._writer is None
+    assert not writer.is_alive()
+    assert manager.load_entry(entry_id).data == {"n": 0}
+
+
+def test_idle_writer_exits_and_releases_manager(tmp_path, monkeypatch):
+    monkeypatch.setattr(history, "WRITER_IDLE_TIMEOUT", 0.05)
+    manager = _manager(tmp_path)
+    first = manager.add_entry("message", {"n": 0})
+    writer = manager._writer
+    writer.join(2)
+    assert not writer.is_alive()
+    assert manager._writer is None
+
+    # The next write starts a new writer
+    second = manager.add_entry("message", {"n": 1})
+    manager.flush()
+    assert manager.load_entry(first) is not None
+    assert manager.load_entry(second) is not None
+    manager._writer.join(2)
+
+    ref = weakref.ref(manager)
+    del manager
+    gc.collect()
+    assert ref() is None
@@ -0,0 +1,75 @@
+"""
+Tests for the request-window rate limiters.
+"""
+import threading
+import time
+
+from python.helpers.rate_limiter import RateLimiter, SlidingWindowRateLimiter
+
+
+def test_rate_limiter_refuses_at_limit():
+    limiter = RateLimiter(max_requests=2, per_seconds=60)
+    assert limiter.acquire(block=False)
+    assert limiter.acquire(block=False)
+    assert not limiter.acquire(block=False)
+    assert limiter.get_stats()['requests_in_window'] == 2
+
+
+def test_rate_limiter_release_wakes_waiter():
+    limiter = RateLimiter(max_requests=1, per_seconds=60)
+    assert limiter.acquire(block=False)
+
+    result = []
+    waiter = threading.Thread(target=lambda: result.append(limiter.acquire(timeout=5)))
+    waiter.start()
+    time.sleep(0.05)
+    limiter.release()
+    waiter.join(5)
+    assert result == [True]
+
+
+def test_sliding_window_acquire_and_wait_at_limit():
+    limiter = SlidingWindowRateLimiter(max_requests=3, per_seconds=0.2)
+    for _ in range(3):
+        assert limiter.acquire(block=False)
+    assert not limiter.acquire(block=False)
+    assert limiter._get_wait_time() > 0
+
+    start = time.monotonic()
+    assert limiter.acquire(timeout=2)
+    assert time.monotonic() - start > 0.1
+
+
+def test_sliding_window_estimate_stays_within_limit():
+    limiter = SlidingWindowRateLimiter(max_requests=2, per_seconds=0.2)
+    for _ in range(6):
+        assert limiter.acquire(timeout=2)
+        assert limiter._requests_in_window(time.monotonic()) <= 2
+
+
+def test_zero_max_requests_admits_nothing():
+    for cls in (RateLimiter, SlidingWindowRateLimiter):
+        limiter = cls(max_requests=0, per_seconds=60)
+        assert not limiter.acquire(block=False)
+        assert limiter._get_wait_time() == 60
+        assert not limiter.acquire(timeout=0.05)
+
+
+def test_ring_buffer_wraps_around():
+    limiter = RateLimiter(max_requests=3, per_seconds=0.05)
+    # Two requests per window move the head to a different slot each time
+    for _ in range(4):
+        assert limiter.acquire(block=False)
+        assert limiter.acquire(block=False)
+        time.sleep(0.06)
+    assert limiter.get_stats()['requests_in_window'] == 0
+    for _ in range(3):
+        assert limiter.acquire(block=False)
+    assert not limiter.acquire(block=False)
+
+
+def test_limiters_are_exported_from_package():
+    import python.helpers as helpers
+
+    assert helpers.SlidingWindowRateLimiter is SlidingWindowRateLimiter
+    assert 'SlidingWindowRateLimiter' in helpers.__all__
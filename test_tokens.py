@@ -0,0 +1,79 @@
+"""
+Tests for the token helpers and TokenWindow.
+"""
+import pytest
+import tiktoken
+
+from python.helpers import tokens
+from python.helpers.tokens import TokenWindow
+
+
+def test_json_round_trip_keeps_big_integers():
+    obj = {"big": 2 ** 70 + 1, "negative": -(2 ** 64) - 1, "small": 42, "f": 0.5}
+    assert tokens._loads(tokens._dumps(obj)) == obj
+    assert isinstance(tokens._loads(tokens._dumps(obj))["big"], int)
+
+
+@pytest.fixture
+def byte_encoding(monkeypatch):
+    """Count one token per byte, without loading a real vocabulary."""
+    encoding = tiktoken.Encoding(
+        name="test_bytes",
+        pat_str=r"[\s\S]",
+        mergeable_ranks={bytes([i]): i for i in range(256)},
+        special_tokens={},
+    )
+    monkeypatch.setattr(tokens, "_get_encoding", lambda model: encoding)
+    tokens._count_tokens_cached.cache_clear()
+    yield encoding
+    tokens._count_tokens_cached.cache_clear()
+
+
+def test_window_add_evicts_oldest(byte_encoding):
+    window = TokenWindow(max_tokens=10)
+    assert window.add("aaaa") == (True, 4)
+    assert window.add("bbbb") == (True, 4)
+    assert window.add("cccc") == (False, 0)
+
+    assert window.add("cccc", evict=True) == (True, 4)
+    assert window.get_contents() == "bbbb\ncccc"
+    assert window.total_tokens == 8
+    assert window.get_contents_length() == 9
+
+
+def test_window_add_evict_rejects_oversized_content(byte_encoding):
+    window = TokenWindow(max_tokens=10)
+    window.add("aaaa")
+    assert window.add("x" * 11, evict=True) == (False, 0)
+    assert window.get_contents() == "aaaa"
+
+
+def test_window_add_evicts_by_item_count(byte_encoding):
+    window = TokenWindow(max_tokens=100, max_items=2)
+    for content in ("a", "b", "c"):
+        assert window.add(content, evict=True)[0]
+    assert window.get_contents() == "b\nc"
+    assert window.pop() == "b"
+    assert window.total_tokens == 1
+
+
+def test_window_clamps_max_tokens_to_model_context(byte_encoding):
+    assert TokenWindow(max_tokens=100_000, model="gpt-4").max_tokens == 8192
+    assert TokenWindow(max_tokens=100_000, model="GPT-3.5-Turbo").max_tokens == 4096
+    assert TokenWindow(max_tokens=1000, model="gpt-4").max_tokens == 1000
+    # Unknown models have no known context size to clamp to
+    assert TokenWindow(max_tokens=100_000, model="local-model").max_tokens == 100_000
+
+
+def test_json_fallback_matches_orjson():
+    orjson = pytest.importorskip("orjson")
+    values = [
+        1e16, 1e-5, 1.5e-5, -1.2345e-5, 1e-6, 1.5e-7, 1e300, -2.5e22, 5e-324,
+        1.2345678901234568e17, 1e15, 0.0001, 0.1, -0.0, 12345.678, 2 ** 53,
+        float("nan"), float("inf"), -float("inf"), True, None, '1e+16 NaN \\"e-05',
+    ]
+    obj = {"values": values, "nested": {"b": [1e16, {"x": 1e-7}], "a": "Infinity"}}
+    expected = orjson.dumps(obj, option=tokens._ORJSON_OPTIONS).decode("utf-8")
+    assert tokens._json_dumps(obj) == expected
+    for value in values:
+        assert tokens._json_dumps(value) == orjson.dumps(value).decode("utf-8")